@@ -1,9 +1,10 @@
 import time
 import os
+import threading
 import board
 import adafruit_bme680
 import RPi.GPIO as GPIO
-from pyModbusTCP.server import ModbusServer
+from pyModbusTCP.server import DataBank, ModbusServer
 
 # --- CONFIGURATION ---
 VERSION_MAJOR = 1
@@ -41,7 +42,25 @@ except Exception as e:
     print(f"BME680 Init Error: {e}")
     sensor = None
 
-server = ModbusServer(SERVER_IP, SERVER_PORT, no_block=True)
+class TransactionalDataBank(DataBank):
+    """
+    Client requests (served from the server threads) and the control loop's
+    transaction share one lock: clients see the register image of the
+    previous or the next cycle, never a half-updated one.
+    """
+    def __init__(self):
+        super().__init__()
+        self.transaction = threading.RLock()
+
+    def get_holding_registers(self, *args, **kwargs):
+        with self.transaction:
+            return super().get_holding_registers(*args, **kwargs)
+
+    def set_holding_registers(self, *args, **kwargs):
+        with self.transaction:
+            return super().set_holding_registers(*args, **kwargs)
+
+server = ModbusServer(SERVER_IP, SERVER_PORT, no_block=True, data_bank=TransactionalDataBank())
 
 def get_cpu_temp():
     res = os.popen('vcgencmd measure_temp').readline()
@@ -62,46 +81,41 @@ start_time = time.time()
 
 try:
     while True:
+        data_bank = server.data_bank
+
         # 1. Update Uptime
         uptime = int(time.time() - start_time)
-        server.data_bank.set_holding_registers(REG_UPTIME, [uptime % 65535])
 
-        # 2. Read BME680 (if enabled)
-        control = server.data_bank.get_holding_registers(REG_BME_CONTROL)[0]
+        # 2. Read BME680 (if enabled) - slow I2C access, outside the transaction
+        control = data_bank.get_holding_registers(REG_BME_CONTROL)[0]
+        bme_values = None
         if control == 1 and sensor:
-            server.data_bank.set_holding_registers(REG_BME_TEMP, [int(sensor.temperature * 10)])
-            server.data_bank.set_holding_registers(REG_BME_HUM, [int(sensor.humidity * 10)])
-            server.data_bank.set_holding_registers(REG_BME_GAS, [int(sensor.gas / 10)])
+            bme_values = [int(sensor.temperature * 10), int(sensor.humidity * 10), int(sensor.gas / 10)]
 
         # 3. CPU Fan Logic
-        cpu_temp = get_cpu_temp()
-        server.data_bank.set_holding_registers(REG_CPU_TEMP, [int(cpu_temp * 10)])
-        
-        high_thr = server.data_bank.get_holding_registers(REG_THR_HIGH)[0]
-        low_thr = server.data_bank.get_holding_registers(REG_THR_LOW)[0]
-        manual_mode = server.data_bank.get_holding_registers(REG_MANUAL_FAN)[0]
-        
-        current_temp_val = int(cpu_temp * 10)
-        
-        # Determine Status
-        status = 0
-        if current_temp_val >= high_thr:
-            status = 1
-        elif current_temp_val <= low_thr:
-            status = 0
-        else:
-            # Keep previous status if between thresholds (Hysteresis)
-            status = server.data_bank.get_holding_registers(REG_TEMP_STATUS)[0]
-            
-        server.data_bank.set_holding_registers(REG_TEMP_STATUS, [status])
+        current_temp_val = int(get_cpu_temp() * 10)
+
+        with data_bank.transaction:
+            # ONE read of the consecutive control block (30..35)
+            _, high_thr, low_thr, status, _, manual_mode = data_bank.get_holding_registers(REG_CPU_TEMP, 6)
+
+            # Determine Status (keep previous status between thresholds: Hysteresis)
+            if current_temp_val >= high_thr:
+                status = 1
+            elif current_temp_val <= low_thr:
+                status = 0
+            fan_status = 1 if manual_mode == 1 or status == 1 else 0
+
+            # Commit all outputs, settings are written back unchanged
+            data_bank.set_holding_registers(REG_UPTIME, [uptime % 65535])
+            if bme_values:
+                data_bank.set_holding_registers(REG_BME_TEMP, bme_values)
+            data_bank.set_holding_registers(
+                REG_CPU_TEMP, [current_temp_val, high_thr, low_thr, status, fan_status, manual_mode]
+            )
 
         # Physical Control
-        if manual_mode == 1 or status == 1:
-            GPIO.output(FAN_PIN, GPIO.HIGH)
-            server.data_bank.set_holding_registers(REG_FAN_STATUS, [1])
-        else:
-            GPIO.output(FAN_PIN, GPIO.LOW)
-            server.data_bank.set_holding_registers(REG_FAN_STATUS, [0])
+        GPIO.output(FAN_PIN, GPIO.HIGH if fan_status else GPIO.LOW)
 
         time.sleep(1)
 
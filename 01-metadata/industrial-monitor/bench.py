@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from capture import load_recording
+from config_watcher import load_config
+from drivers.modbus_client import ModbusDriver
+from drivers.opcua_client import OpcUaDriver
+from replay import ReplayServers, MODBUS_PORT, OPCUA_PORT
+
+def summarize(name, latencies, readouts, duration):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"driver": name, "polls": 0}
+    return {
+        "driver": name,
+        "polls": len(latencies),
+        "polls_per_s": len(latencies) / duration,
+        "readouts_per_s": readouts / duration,
+        "latency_ms_p50": statistics.median(latencies) * 1000,
+        "latency_ms_p95": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "latency_ms_max": latencies[-1] * 1000,
+    }
+
+async def bench_driver(name, read, duration):
+    latencies, readouts = [], 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        results = await read()
+        latencies.append(time.perf_counter() - start)
+        readouts += len(results)
+    return summarize(name, latencies, readouts, duration)
+
+async def run_benchmark(capture, config_path="config.yaml", speed=100.0, duration=10.0,
+                        modbus_port=MODBUS_PORT, opcua_port=OPCUA_PORT):
+    """
+    Replays `capture` through local stand-in servers and polls them with the
+    real drivers as fast as possible - a hardware free, repeatable measure of
+    the monitor's acquisition pipeline.
+    """
+    config = load_config(config_path)
+    servers = ReplayServers(load_recording(capture), modbus_port=modbus_port, opcua_port=opcua_port)
+    await servers.start()
+    replay_task = asyncio.create_task(servers.replay(speed, loop=True))
+
+    modbus_cfg = dict(config['modbus_connection'], host="127.0.0.1", port=modbus_port)
+    modbus = ModbusDriver(modbus_cfg, config['modbus_tags'])
+    opcua_cfg = dict(config['opcua_connection'], url=servers.opcua_url, security=None, identity=None)
+    opcua = OpcUaDriver(opcua_cfg, config['opcua_tags'])
+
+    try:
+        # The Modbus client is blocking, run it off the loop that serves the replay
+        results = [
+            await bench_driver("modbus", lambda: asyncio.to_thread(modbus.read_all), duration),
+            await bench_driver("opcua", opcua.read_all, duration),
+        ]
+    finally:
+        replay_task.cancel()
+        modbus.close()
+        await opcua.disconnect()
+        await servers.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drivers against a replayed capture.")
+    parser.add_argument("capture")
+    parser.add_argument("--config", default="config.yaml", help="Tag mapping to benchmark")
+    parser.add_argument("--speed", type=float, default=100.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per driver")
+    parser.add_argument("--json", action="store_true", help="Machine readable output for CI")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.capture, args.config, args.speed, args.duration))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        if not r["polls"]:
+            print(f"{r['driver']:>7}: no successful polls")
+            continue
+        print(f"{r['driver']:>7}: {r['polls_per_s']:8.1f} polls/s  {r['readouts_per_s']:9.1f} values/s  "
+              f"p50 {r['latency_ms_p50']:.2f} ms  p95 {r['latency_ms_p95']:.2f} ms  max {r['latency_ms_max']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import gzip
+import json
+import logging
+import time
+
+# Values the replay can serve again (scalar JSON types)
+SUPPORTED_VALUE_TYPES = (bool, int, float, str)
+
+class Recorder:
+    """
+    Records what the drivers see on the wire into a gzip compressed JSON
+    lines file, one event per line:
+        {"t": 1712.5, "kind": "modbus", "unit": 1, "start": 30, "registers": [..]}
+        {"t": 1712.6, "kind": "opcua", "node_id": "ns=1;i=1024", "value": 52.1, "type": "Double"}
+        {"t": 1712.6, "kind": "opcua_node", "node_id": "ns=2;s=CPUTemperature",
+         "browse_path": "FanControl/0:CPUTemperature", "namespace_uri": "urn:..", "namespace_index": 2,
+         "unit": "°C", "eu_range": [0.0, 75.0]}
+    Raw register blocks (not the scaled values) are stored, so a replay
+    exercises the full decode path of the drivers. Every run starts a new
+    file, so the replay timing has no gaps between sessions.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._skipped = set()
+
+    def _write(self, event):
+        event["t"] = time.time()
+        self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+    def record_modbus(self, unit, start, registers):
+        self._write({"kind": "modbus", "unit": unit, "start": start, "registers": list(registers)})
+
+    def record_opcua(self, node_id, value, variant_type):
+        if not isinstance(value, SUPPORTED_VALUE_TYPES):
+            # e.g. ExtensionObjects or arrays: the replay could not serve them
+            if node_id not in self._skipped:
+                self._skipped.add(node_id)
+                logging.warning(f"Not recording {node_id}: unsupported value type {variant_type}")
+            return
+        self._write({"kind": "opcua", "node_id": node_id, "value": value, "type": variant_type})
+
+    def record_opcua_node(self, node_id, browse_path, namespace_uri, namespace_index, unit=None, eu_range=None):
+        """Where a discovered node lives, so the replay can rebuild the browse path."""
+        self._write({
+            "kind": "opcua_node", "node_id": node_id, "browse_path": browse_path,
+            "namespace_uri": namespace_uri, "namespace_index": namespace_index,
+            "unit": unit, "eu_range": eu_range,
+        })
+
+    def close(self):
+        self._file.close()
+
+
+def load_recording(path):
+    """Returns all events of a capture file sorted by time."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e["t"])
+    return events
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+from drivers.base import SensorReadout
+from drivers.modbus_client import ModbusDriver
+from drivers.opcua_client import OpcUaDriver
+
+SLOT_FIELDS = 4          # seq, value, timestamp, flags (all float64)
+FLAG_VALID = 1
+FLAG_BOOL = 2
+POLL_PERIOD_S = 1.0
+MAX_READ_RETRIES = 1000  # Seqlock retries before a slot counts as unavailable
+
+
+def build_devices(config):
+    """
+    Device list of the collector. An explicit `devices:` section is used as
+    is, otherwise the classic single modbus/opcua sections become two devices.
+    """
+    if config.get('devices'):
+        return config['devices']
+    return [
+        {"name": "modbus", "protocol": "modbus",
+         "connection": config['modbus_connection'], "tags": config['modbus_tags']},
+        {"name": "opcua", "protocol": "opcua",
+         "connection": config['opcua_connection'], "tags": config['opcua_tags']},
+    ]
+
+
+class LatestValueTable:
+    """
+    Latest value + timestamp per (device, tag) in a shared memory block.
+
+    Every slot is guarded by a sequence counter (seqlock): the single writer
+    makes it odd while updating, readers retry when they see an odd or
+    changed counter. Readers never block the workers and nothing is pickled
+    or copied through pipes - the UI reads the floats in place.
+    """
+    def __init__(self, devices, name=None, create=False):
+        self.slots = {}
+        for device in devices:
+            for tag in device['tags']:
+                self.slots[(device['name'], tag['name'])] = len(self.slots)
+        size = max(1, len(self.slots)) * SLOT_FIELDS * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.data = self.shm.buf.cast("d")
+        if create:
+            for i in range(len(self.data)):
+                self.data[i] = 0.0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, device, tag, value, timestamp):
+        base = self.slots[(device, tag)] * SLOT_FIELDS
+        data = self.data
+        seq = data[base]
+        if seq % 2:
+            seq += 1                                # Left odd by a dead writer
+        data[base] = seq + 1                        # odd -> update in progress
+        data[base + 1] = float(value)
+        data[base + 2] = timestamp
+        data[base + 3] = FLAG_VALID | (FLAG_BOOL if isinstance(value, bool) else 0)
+        data[base] = seq + 2                        # even -> consistent
+
+    def read(self, device, tag):
+        """
+        Returns (value, timestamp), or None if the slot was never written or
+        stays inconsistent (writer died in the middle of an update).
+        """
+        base = self.slots[(device, tag)] * SLOT_FIELDS
+        data = self.data
+        for _ in range(MAX_READ_RETRIES):
+            seq = data[base]
+            if seq % 2:
+                continue
+            value, timestamp, flags = data[base + 1], data[base + 2], int(data[base + 3])
+            if data[base] == seq:
+                break
+        else:
+            return None
+        if not flags & FLAG_VALID:
+            return None
+        return (bool(value) if flags & FLAG_BOOL else value), timestamp
+
+    def close(self, unlink=False):
+        self.data.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _make_driver(device):
+    if device['protocol'] == 'modbus':
+        return ModbusDriver(device['connection'], device['tags'])
+    return OpcUaDriver(device['connection'], device['tags'])
+
+
+async def _poll_devices(table, devices, period):
+    drivers = [(device['name'], _make_driver(device)) for device in devices]
+
+    async def poll(name, driver):
+        if asyncio.iscoroutinefunction(driver.read_all):
+            result = await driver.read_all()
+        else:
+            # Blocking Modbus client: keep the other devices of the shard going
+            result = await asyncio.to_thread(driver.read_all)
+        now = time.time()
+        for readout in result:
+            table.write(name, readout.name, readout.value, now)
+
+    while True:
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(poll(name, driver) for name, driver in drivers), return_exceptions=True
+        )
+        for (name, _), result in zip(drivers, results):
+            if isinstance(result, Exception):
+                logging.debug(f"Polling {name} failed: {result}")
+        await asyncio.sleep(max(0.0, period - (time.monotonic() - start)))
+
+
+def worker_main(shm_name, all_devices, my_devices, period):
+    """Entry point of one shard process."""
+    table = LatestValueTable(all_devices, name=shm_name)
+    try:
+        asyncio.run(_poll_devices(table, my_devices, period))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+
+class ShardedCollector:
+    """
+    Spreads the devices over worker processes (one per core by default),
+    each running its own asyncio loop with the normal drivers, and exposes
+    the results of all shards through one LatestValueTable.
+    """
+    def __init__(self, config, workers=None, period=POLL_PERIOD_S):
+        self.devices = build_devices(config)
+        self.period = period
+        workers = workers or os.cpu_count() or 1
+        self.workers = max(1, min(workers, len(self.devices)))
+        self.table = LatestValueTable(self.devices, create=True)
+        self.shards = [self.devices[i::self.workers] for i in range(self.workers)]
+        self.processes = []
+        self._last_check = 0.0
+
+    def _start_worker(self, i):
+        ctx = mp.get_context("spawn")  # No inherited event loop / sockets
+        proc = ctx.Process(
+            target=worker_main,
+            args=(self.table.name, self.devices, self.shards[i], self.period),
+            name=f"collector-shard-{i}",
+            daemon=True,
+        )
+        proc.start()
+        return proc
+
+    def start(self):
+        self.processes = [self._start_worker(i) for i in range(len(self.shards))]
+        logging.info(f"Started {len(self.processes)} collector shards for {len(self.devices)} devices")
+
+    def check_workers(self):
+        """Restarts shard processes that died (checked at most once per poll period)."""
+        now = time.monotonic()
+        if now - self._last_check < self.period:
+            return
+        self._last_check = now
+        for i, proc in enumerate(self.processes):
+            if not proc.is_alive():
+                logging.warning(f"{proc.name} died (exit code {proc.exitcode}), restarting")
+                self.processes[i] = self._start_worker(i)
+
+    def stop(self):
+        for proc in self.processes:
+            proc.terminate()
+        for proc in self.processes:
+            proc.join()
+        self.processes = []
+        self.table.close(unlink=True)
+
+    def read_device(self, name, max_age=None):
+        """Latest readouts of one device, like a driver's read_all()."""
+        self.check_workers()
+        device = next((d for d in self.devices if d['name'] == name), None)
+        if device is None:
+            return []
+        source = "Modbus" if device['protocol'] == 'modbus' else "OPC-UA"
+        now = time.time()
+        results = []
+        for tag in device['tags']:
+            latest = self.table.read(name, tag['name'])
+            if latest is None:
+                continue
+            value, timestamp = latest
+            if max_age is not None and now - timestamp > max_age:
+                continue  # Shard lost the device, do not show frozen values
+            results.append(SensorReadout(
+                name=tag['name'],
+                value=value,
+                unit=tag.get('unit', ""),
+                source=source
+            ))
+        return results
@@ -0,0 +1,176 @@
+import math
+
+# Defaults per history series; a tag can override them with a `compression:` entry
+DEFAULT_ANALOG = {"method": "swinging_door", "deviation": 0.2, "max_interval": 60}
+DEFAULT_BOOL = {"method": "deadband", "deviation": 0, "max_interval": 60}
+
+
+class PassThrough:
+    """Stores every sample (method: none)."""
+    def offer(self, t, v):
+        return [(t, v)]
+
+    def pending(self):
+        return None
+
+
+class DeadbandFilter:
+    """
+    Stores a sample only if it differs from the last stored one by more
+    than the deadband (absolute, or percent of the last stored value), or
+    if max_interval seconds passed. deviation 0 = store changes only, which
+    is exactly right for step signals like the fan status.
+    """
+    def __init__(self, deviation=0.0, percent=False, max_interval=None):
+        self.deviation = deviation
+        self.percent = percent
+        self.max_interval = max_interval
+        self.last = None     # Last stored (t, v)
+        self.latest = None   # Last received (t, v), shown as the live tail
+
+    def offer(self, t, v):
+        if math.isnan(v):
+            return self._gap(t, v)
+        self.latest = (t, v)
+        if self.last is None or math.isnan(self.last[1]):
+            self.last = (t, v)
+            return [(t, v)]
+        band = abs(self.last[1]) * self.deviation / 100.0 if self.percent else self.deviation
+        expired = self.max_interval is not None and t - self.last[0] >= self.max_interval
+        if abs(v - self.last[1]) > band or expired:
+            self.last = (t, v)
+            return [(t, v)]
+        return []
+
+    def _gap(self, t, v):
+        # Close the trend at the last good value, then mark the outage
+        out = []
+        if self.latest and self.last and self.latest[0] != self.last[0]:
+            out.append(self.latest)
+        if self.last is None or not math.isnan(self.last[1]):
+            out.append((t, v))
+        self.last = (t, v)
+        self.latest = None
+        return out
+
+    def pending(self):
+        if self.latest and self.last and self.latest[0] != self.last[0]:
+            return self.latest
+        return None
+
+
+class SwingingDoorFilter:
+    """
+    Swinging door trending: a point is archived only when a straight line
+    from the last archived point can no longer represent all samples since
+    then within +/- deviation. Linear interpolation between archived points
+    reproduces the signal within that deviation.
+    """
+    def __init__(self, deviation=0.2, max_interval=None):
+        self.deviation = deviation
+        self.max_interval = max_interval
+        self.archived = None
+        self.held = None
+        self.slope_min = -math.inf   # Lower door
+        self.slope_max = math.inf    # Upper door
+
+    def _open_doors(self, t, v):
+        ta, va = self.archived
+        dt = t - ta
+        self.slope_min = (v - self.deviation - va) / dt
+        self.slope_max = (v + self.deviation - va) / dt
+
+    def offer(self, t, v):
+        if math.isnan(v):
+            out = [self.held] if self.held else []
+            if self.archived is None or not math.isnan(self.archived[1]):
+                out.append((t, v))
+            self.archived, self.held = None, None
+            return out
+        if self.archived is None:
+            self.archived, self.held = (t, v), None
+            self.slope_min, self.slope_max = -math.inf, math.inf
+            return [(t, v)]
+
+        ta, va = self.archived
+        dt = t - ta
+        if dt <= 0:
+            return []
+        slope = (v - va) / dt
+        expired = self.max_interval is not None and dt >= self.max_interval
+
+        if (not self.slope_min <= slope <= self.slope_max or expired) and self.held is not None:
+            # Sample outside the doors: archive the previous sample and restart
+            # from it. The doors always contain the held sample's own slope, so
+            # the archived line stays within deviation of every sample so far.
+            self.archived = self.held
+            self._open_doors(t, v)
+            self.held = (t, v)
+            return [self.archived]
+
+        self.slope_min = max(self.slope_min, (v - self.deviation - va) / dt)
+        self.slope_max = min(self.slope_max, (v + self.deviation - va) / dt)
+        self.held = (t, v)
+        return []
+
+    def pending(self):
+        return self.held
+
+
+def default_spec(is_bool):
+    return DEFAULT_BOOL if is_bool else DEFAULT_ANALOG
+
+
+def make_filter(spec):
+    spec = spec or {}
+    method = spec.get("method", "none")
+    if method == "swinging_door":
+        return SwingingDoorFilter(spec.get("deviation", 0.2), spec.get("max_interval"))
+    if method == "deadband":
+        return DeadbandFilter(spec.get("deviation", 0.0), spec.get("percent", False), spec.get("max_interval"))
+    return PassThrough()
+
+
+class TagCompressor:
+    """
+    One filter per (device, tag), used in front of persistent stores:
+    returns the (timestamp, tag, value) points that have to be kept.
+    """
+    def __init__(self, tags_by_device):
+        self.specs = {
+            (device, tag['name']): tag.get('compression')
+            for device, tags in tags_by_device.items() for tag in tags
+        }
+        self.filters = {}
+
+    def set_tags(self, device, tags):
+        """
+        New tag list of one device (config reload). Filters of tags whose spec
+        changed or that were removed are dropped; their not yet archived
+        points are returned as (timestamp, tag, value) so they can be stored.
+        """
+        specs = {tag['name']: tag.get('compression') for tag in tags}
+        flushed = []
+        for (dev, name) in list(self.specs):
+            if dev == device and (name not in specs or specs[name] != self.specs[(dev, name)]):
+                del self.specs[(dev, name)]
+        for (dev, name), f in list(self.filters.items()):
+            if dev == device and (dev, name) not in self.specs:
+                tail = f.pending()
+                if tail is not None:
+                    flushed.append((tail[0], name, tail[1]))
+                del self.filters[(dev, name)]
+        for name, spec in specs.items():
+            self.specs[(device, name)] = spec
+        return flushed
+
+    def compress(self, ts, device, readouts):
+        points = []
+        for r in readouts:
+            f = self.filters.get((device, r.name))
+            if f is None:
+                # Without an explicit spec the default follows the value type
+                spec = self.specs.get((device, r.name)) or default_spec(isinstance(r.value, bool))
+                f = self.filters[(device, r.name)] = make_filter(spec)
+            points += [(t, r.name, v) for t, v in f.offer(ts, float(r.value))]
+        return points
@@ -0,0 +1,82 @@
+import logging
+import os
+import yaml
+
+def load_config(path):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+REQUIRED_SECTIONS = ("modbus_connection", "modbus_tags", "opcua_connection", "opcua_tags")
+
+def _tag_errors(section, tags, address_keys):
+    if not isinstance(tags, list):
+        return [f"{section} must be a list"]
+    errors = []
+    for i, tag in enumerate(tags):
+        if not isinstance(tag, dict) or 'name' not in tag:
+            errors.append(f"{section}[{i}] has no name")
+        elif not any(tag.get(key) is not None for key in address_keys):
+            errors.append(f"{section}[{i}] ({tag['name']}) needs {' or '.join(address_keys)}")
+    return errors
+
+def validate_config(config):
+    """List of problems that would break the running monitor (empty = usable)."""
+    errors = [f"missing section {name}" for name in REQUIRED_SECTIONS if not config.get(name)]
+    errors += _tag_errors("modbus_tags", config.get('modbus_tags') or [], ("register",))
+    errors += _tag_errors("opcua_tags", config.get('opcua_tags') or [], ("node_id", "browse_path"))
+    for device in config.get('devices') or []:
+        if not isinstance(device, dict) or not all(k in device for k in ("name", "protocol", "connection", "tags")):
+            errors.append("devices entries need name, protocol, connection and tags")
+            continue
+        keys = ("register",) if device['protocol'] == 'modbus' else ("node_id", "browse_path")
+        errors += _tag_errors(f"devices[{device['name']}].tags", device['tags'], keys)
+    return errors
+
+def changed_sections(old, new):
+    """Top level keys whose content differs between two configs."""
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+class ConfigWatcher:
+    """
+    Polls the mtime of the config file (cheap stat call, works on every OS
+    and on network mounts where inotify does not) and hands out the new
+    config only if it parses, passes validate_config() and actually differs.
+    The caller confirms with accept() once the config is applied.
+    """
+    def __init__(self, path, current):
+        self.path = path
+        self.current = current
+        self._mtime = self._stat()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def poll(self):
+        """Returns (new_config, changed_sections) or None if nothing changed."""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            new = load_config(self.path)
+        except (OSError, yaml.YAMLError) as e:
+            logging.warning(f"Ignoring invalid config {self.path}: {e}")
+            return None
+        if not isinstance(new, dict):
+            logging.warning(f"Ignoring invalid config {self.path}: not a mapping")
+            return None
+        errors = validate_config(new)
+        if errors:
+            logging.warning(f"Ignoring invalid config {self.path}: {'; '.join(errors)}")
+            return None
+        changes = changed_sections(self.current, new)
+        if not changes:
+            return None
+        return new, changes
+
+    def accept(self, new):
+        """Marks `new` as the running config (changes are diffed against it)."""
+        self.current = new
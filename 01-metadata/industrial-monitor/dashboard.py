@@ -0,0 +1,118 @@
+from collections import deque
+
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+UNIT_MAP = {"Ambient Temp": "°C", "Humidity": "%", "CPU Temp": "°C"}
+HIDDEN_TAGS = ("Gas",)  # Hide gas as requested
+
+
+def make_formatter(name, value):
+    """
+    Builds the value formatter of a tag ONCE, when the tag is first seen.
+    Returns a function value -> (text, style).
+    """
+    if isinstance(value, bool):
+        on, off = ("RUNNING", "STOPPED")
+        if "Status" not in name and "Fan" not in name:
+            on, off = ("ENABLED", "PAUSED")
+        return lambda v: (on, "bold green") if v else (off, "bold red")
+    return lambda v: (f"{v:.1f}", "bold green")
+
+
+class TagRow:
+    __slots__ = ("name", "value", "style", "format", "name_cell", "value_cell", "unit_cell")
+
+    def __init__(self, readout):
+        self.name = readout.name
+        self.value = None
+        self.style = ""
+        self.format = make_formatter(readout.name, readout.value)
+        unit = "" if isinstance(readout.value, bool) else (readout.unit or UNIT_MAP.get(readout.name, ""))
+        self.name_cell = Text(readout.name, style="cyan")
+        self.value_cell = Text("", justify="right")
+        self.unit_cell = Text(unit, style="dim")
+
+
+class TagTable:
+    """
+    Persistent table model of one pane: the rich Table and its Text cells
+    are created once per tag, afterwards only cells whose value changed are
+    rewritten in place. update() reports whether anything visible changed,
+    so the caller can refresh the screen only on data changes.
+    """
+    def __init__(self, title):
+        self.panel = Panel(Text("Connecting..."), title=title)
+        self.reset()
+
+    def reset(self):
+        """Drops all rows, e.g. after tags were removed from the config."""
+        self.rows = {}
+        self.stale = False
+        self.table = Table(expand=True, border_style="white", box=None)
+        self.table.add_column("Parameter", style="cyan")
+        self.table.add_column("Value", justify="right")
+        self.table.add_column("Unit", style="dim")
+        self.panel.renderable = Text("Connecting...")
+
+    def _add_row(self, readout):
+        row = TagRow(readout)
+        self.rows[readout.name] = row
+        self.table.add_row(row.name_cell, row.value_cell, row.unit_cell)
+        self.panel.renderable = self.table
+        return row
+
+    def _set_stale(self, stale):
+        if stale == self.stale:
+            return False
+        self.stale = stale
+        for row in self.rows.values():
+            row.value_cell.style = "dim" if stale else row.style
+        return bool(self.rows)
+
+    def update(self, data):
+        if not data:
+            # Keep the last known values, but show that they are outdated
+            return self._set_stale(True)
+
+        changed = self._set_stale(False)
+        for d in data:
+            if any(hidden in d.name for hidden in HIDDEN_TAGS):
+                continue
+            row = self.rows.get(d.name) or self._add_row(d)
+            if row.value == d.value:
+                continue
+            row.value = d.value
+            text, row.style = row.format(d.value)
+            row.value_cell.plain = text
+            row.value_cell.style = row.style
+            changed = True
+        return changed
+
+
+class EventLog:
+    """Last N server events (alarms, setpoint changes), newest first."""
+    def __init__(self, title="EVENTS", size=5):
+        self.events = deque(maxlen=size)
+        self.panel = Panel(Text("No events", style="dim"), title=title)
+        self.changed = False
+
+    def add(self, event):
+        self.events.appendleft(event)
+        self.changed = True
+
+    def update(self):
+        """Rebuilds the (small) table only if events arrived since the last call."""
+        if not self.changed:
+            return False
+        self.changed = False
+        table = Table(expand=True, box=None, show_header=False)
+        table.add_column("Time", style="dim", width=8)
+        table.add_column("Message")
+        for event in self.events:
+            style = "bold red" if event.severity >= 700 else ("yellow" if event.severity >= 400 else "")
+            stamp = event.time.strftime('%H:%M:%S') if event.time else "--:--:--"
+            table.add_row(stamp, Text(event.message, style=style))
+        self.panel.renderable = table
+        return True
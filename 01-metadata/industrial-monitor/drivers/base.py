@@ -1,8 +1,17 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 
 @dataclass
 class SensorReadout:
     name: str
     value: float | bool
     unit: str
-    source: str # "Modbus" or "OPC-UA"
\ No newline at end of file
+    source: str # "Modbus" or "OPC-UA"
+
+@dataclass
+class EventReadout:
+    time: datetime
+    severity: int
+    message: str
+    event_type: str
+    fields: dict = field(default_factory=dict)
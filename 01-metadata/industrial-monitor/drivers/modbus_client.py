@@ -1,36 +1,74 @@
 from pymodbus.client import ModbusTcpClient
 from .base import SensorReadout
 
+MAX_BLOCK_SIZE = 125  # Max registers per FC3 request (Modbus spec)
+MAX_GAP = 8           # Read over small gaps instead of starting a new request
+
+def compile_read_plan(tags, max_gap=MAX_GAP):
+    """
+    Groups the tags into contiguous register blocks so one request serves
+    many tags: [(start, count, [(offset, tag), ...]), ...]
+    """
+    plan = []
+    for tag in sorted(tags, key=lambda t: t['register']):
+        reg = tag['register']
+        if plan:
+            start, count, members = plan[-1]
+            end = start + count
+            if reg < end + max_gap and reg - start < MAX_BLOCK_SIZE:
+                plan[-1] = (start, max(count, reg - start + 1), members + [(reg - start, tag)])
+                continue
+        plan.append((reg, 1, [(0, tag)]))
+    return plan
+
 class ModbusDriver:
     def __init__(self, config, tags):
         self.client = ModbusTcpClient(config['host'], port=config['port'])
-        self.tags = tags
         self.device_id = config['device_id']
+        self.recorder = None  # Optional capture.Recorder
+        self.set_tags(tags)
+
+    def set_tags(self, tags):
+        """Swaps the tag list (e.g. on config reload) keeping the connection."""
+        self.tags = tags
+        self.plan = compile_read_plan(tags)
+
+    def close(self):
+        self.client.close()
 
     def read_all(self):
         results = []
         if not self.client.connected:
             self.client.connect()
-            
-        for tag in self.tags:
+
+        readouts = {}
+        for start, count, members in self.plan:
             resp = self.client.read_holding_registers(
-                address=tag['register'], 
-                count=1, 
+                address=start,
+                count=count,
                 device_id=self.device_id
             )
-            
-            if not resp.isError():
-                raw = resp.registers[0]
+
+            if resp.isError():
+                continue
+            if self.recorder:
+                self.recorder.record_modbus(self.device_id, start, resp.registers)
+            for offset, tag in members:
+                raw = resp.registers[offset]
                 # MANUAL SCALING AND TYPING
                 value = raw * tag.get('scale', 1.0)
-                
+
                 if tag.get('type') == 'bool':
                     value = bool(raw)
-                
-                results.append(SensorReadout(
+
+                readouts[tag['name']] = SensorReadout(
                     name=tag['name'],
                     value=value,
                     unit=tag['unit'],
                     source="Modbus"
-                ))
-        return results
\ No newline at end of file
+                )
+        # Keep the configured tag order
+        for tag in self.tags:
+            if tag['name'] in readouts:
+                results.append(readouts[tag['name']])
+        return results
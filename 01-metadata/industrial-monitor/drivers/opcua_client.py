@@ -1,26 +1,208 @@
-from asyncua import Client
-from .base import SensorReadout
+import logging
+from asyncua import Client, ua
+from .base import EventReadout, SensorReadout
+from .opcua_discovery import DEFAULT_CACHE_PATH, DEFAULT_MODEL_VERSION, NodeMapCache, discover_nodes
+
+DEFAULT_APP_URI = "urn:industrial-monitor:opc-ua:client"
+DEFAULT_CHANNEL_LIFETIME_MS = 3600000  # Requested secure channel token lifetime
+DEFAULT_SESSION_TIMEOUT_MS = 3600000
+DEFAULT_EVENT_NAMESPACE = "urn:fan:control:opc-ua:server"
+DEFAULT_DISCOVERY_NAMESPACE = "urn:fan:control:opc-ua:server"
+# Read results that mean a cached node id no longer exists on the server
+STALE_NODE_CODES = (ua.StatusCodes.BadNodeIdUnknown, ua.StatusCodes.BadNodeIdInvalid)
+DEFAULT_EVENT_TYPES = ["OverheatAlarmEventType", "SetpointChangedEventType", "WriteRejectedEventType"]
+
+class _EventForwarder:
+    """asyncua subscription handler, converts events into EventReadouts."""
+    def __init__(self, handler, type_names):
+        self.handler = handler
+        self.type_names = type_names
+
+    def event_notification(self, event):
+        fields = {name: variant.Value for name, variant in event.get_event_props_as_fields_dict().items()}
+        message = fields.get("Message")
+        self.handler(EventReadout(
+            time=fields.get("Time"),
+            severity=fields.get("Severity") or 0,
+            message=message.Text if hasattr(message, "Text") else str(message),
+            event_type=self.type_names.get(fields.get("EventType"), str(fields.get("EventType"))),
+            fields=fields,
+        ))
 
 class OpcUaDriver:
+    """
+    Keeps ONE session open across polls. The asymmetric (RSA) handshake is
+    only done on connect; afterwards asyncua renews the channel token in the
+    background before RevisedLifetime expires, so every poll only pays the
+    symmetric crypto of a single Read request.
+
+    Tags either carry a fixed `node_id` or a `browse_path` below the
+    Objects folder (e.g. "FanControl/0:CPUTemperature"). Browse paths are
+    resolved once per session, from the on-disk node map cache if possible,
+    together with the EngineeringUnits/EURange of each variable.
+    """
     def __init__(self, config, tags):
         self.url = config['url']
+        self.config = config
+        self.tags = tags
+        self.client = None
+        self.nodes = None        # Resolved nodes, None = resolve on next poll
+        self.node_tags = []      # Tags belonging to self.nodes
+        self.metadata = {}       # Tag name -> {"unit": .., "eu_range": [low, high]}
+        self.node_cache = None
+        self.namespace = None    # (uri, index) of the discovery namespace
+        self.cache_key = None    # NodeMapCache entry of the discovered nodes
+        self.recorder = None  # Optional capture.Recorder
+        self.event_handler = None
+
+    async def _create_client(self):
+        client = Client(url=self.url)
+        client.application_uri = self.config.get('application_uri', DEFAULT_APP_URI)
+        client.secure_channel_timeout = self.config.get('secure_channel_lifetime_ms', DEFAULT_CHANNEL_LIFETIME_MS)
+        client.session_timeout = self.config.get('session_timeout_ms', DEFAULT_SESSION_TIMEOUT_MS)
+
+        # Optional: Basic256Sha256 Sign / SignAndEncrypt
+        security = self.config.get('security')
+        if security and security.get('policy', 'None') != 'None':
+            parts = [
+                security['policy'],
+                security.get('mode', 'SignAndEncrypt'),
+                security['certificate'],
+                security['private_key'],
+            ]
+            if security.get('server_certificate'):
+                parts.append(security['server_certificate'])
+            await client.set_security_string(",".join(parts))
+
+        # Optional: user identity (anonymous if not configured)
+        identity = self.config.get('identity') or {}
+        if identity.get('type') == 'username':
+            client.set_user(identity['username'])
+            client.set_password(identity['password'])
+        elif identity.get('type') == 'x509':
+            await client.load_client_certificate(identity['certificate'])
+            await client.load_private_key(identity['private_key'])
+        return client
+
+    def set_tags(self, tags):
+        """Swaps the tag list (e.g. on config reload) keeping the session."""
         self.tags = tags
-        self.client = Client(url=self.url)
+        self.nodes = None
+
+    async def connect(self):
+        if self.client is not None:
+            return
+        client = await self._create_client()
+        await client.connect()
+        self.client = client
+        self.nodes = None
+        if self.event_handler:
+            await self._subscribe_events()
+
+    def subscribe_events(self, handler):
+        """
+        Registers handler(EventReadout) for the server's alarms/events. The
+        subscription is (re)created with every new session, ONE per device.
+        """
+        self.event_handler = handler
+
+    async def _subscribe_events(self):
+        cfg = self.config.get('events') or {}
+        try:
+            ns = await self.client.get_namespace_index(cfg.get('namespace_uri', DEFAULT_EVENT_NAMESPACE))
+            type_names = {}
+            for name in cfg.get('types', DEFAULT_EVENT_TYPES):
+                node = await self.client.nodes.base_event_type.get_child(f"{ns}:{name}")
+                type_names[node.nodeid] = name
+            sub = await self.client.create_subscription(
+                cfg.get('publishing_interval_ms', 500), _EventForwarder(self.event_handler, type_names)
+            )
+            await sub.subscribe_events(
+                self.client.nodes.server,
+                [self.client.get_node(nodeid) for nodeid in type_names],
+            )
+        except Exception as e:
+            # Server without these event types: keep polling values only
+            logging.warning(f"OPC UA event subscription failed: {e}")
+
+    async def _discover(self, paths):
+        cfg = self.config.get('discovery') or {}
+        if self.node_cache is None:
+            self.node_cache = NodeMapCache(cfg.get('cache', DEFAULT_CACHE_PATH))
+        uri = cfg.get('namespace_uri', DEFAULT_DISCOVERY_NAMESPACE)
+        ns = await self.client.get_namespace_index(uri)
+        self.namespace = (uri, ns)
+        key = self.cache_key = NodeMapCache.key(uri, cfg.get('model_version', DEFAULT_MODEL_VERSION))
+        node_map = self.node_cache.get(key, ns, paths)
+        if node_map is None:
+            node_map = await discover_nodes(self.client, ns, paths)
+            self.node_cache.put(key, ns, node_map)
+        return node_map
+
+    async def _resolve_nodes(self):
+        paths = [tag['browse_path'] for tag in self.tags if not tag.get('node_id')]
+        node_map = await self._discover(paths) if paths else {}
+        nodes, node_tags, metadata = [], [], {}
+        for tag in self.tags:
+            info = {"unit": None, "eu_range": None}
+            if tag.get('node_id'):
+                node_id = tag['node_id']
+            elif tag['browse_path'] in node_map:
+                info = node_map[tag['browse_path']]
+                node_id = info['node_id']
+            else:
+                continue # Not found on this server, already logged
+            nodes.append(self.client.get_node(node_id))
+            node_tags.append(tag)
+            if self.recorder and not tag.get('node_id'):
+                self.recorder.record_opcua_node(
+                    node_id, tag['browse_path'], *self.namespace, info['unit'], info['eu_range']
+                )
+            metadata[tag['name']] = {
+                "unit": tag.get('unit', info['unit']),
+                "eu_range": info['eu_range'],
+            }
+        self.nodes, self.node_tags, self.metadata = nodes, node_tags, metadata
+
+    async def disconnect(self):
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                await client.disconnect()
+            except Exception:
+                pass # Connection is already gone
 
     async def read_all(self):
         results = []
         try:
-            async with self.client:
-                for tag in self.tags:
-                    node = self.client.get_node(tag['node_id'])
-                    val = await node.get_value()
-                    # We can even fetch the unit from the server if we wanted!
-                    results.append(SensorReadout(
-                        name=tag['name'],
-                        value=val,
-                        unit="", # Let's assume units are part of the value or handled in UI
-                        source="OPC-UA"
-                    ))
-        except Exception:
-            pass # Handle connection errors
-        return results
\ No newline at end of file
+            await self.connect()
+            # Raises if the keepalive or the token renewal failed in the background
+            await self.client.check_connection()
+            if self.nodes is None:
+                await self._resolve_nodes()
+            # One Read request for all tags instead of one round trip per tag
+            data_values = await self.client.read_attributes(self.nodes, ua.AttributeIds.Value)
+            stale = []  # Browse paths whose cached node is gone on the server
+            for tag, node, dv in zip(self.node_tags, self.nodes, data_values):
+                if not dv.StatusCode.is_good():
+                    if dv.StatusCode.value in STALE_NODE_CODES and not tag.get('node_id'):
+                        stale.append(tag['browse_path'])
+                    continue # e.g. BadNodeIdUnknown for a single tag
+                val = dv.Value.Value
+                if self.recorder:
+                    self.recorder.record_opcua(node.nodeid.to_string(), val, dv.Value.VariantType.name)
+                results.append(SensorReadout(
+                    name=tag['name'],
+                    value=val,
+                    unit=self.metadata[tag['name']]['unit'] or "",
+                    source="OPC-UA"
+                ))
+            if stale:
+                logging.warning(f"OPC UA nodes vanished, rediscovering: {stale}")
+                self.node_cache.invalidate(self.cache_key, stale)
+                self.nodes = None
+        except Exception as e:
+            # Handle connection errors: drop the session, reconnect on next poll
+            logging.debug(f"OPC UA read failed: {e}")
+            await self.disconnect()
+        return results
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+from asyncua import ua
+
+DEFAULT_CACHE_PATH = "nodemap.json"
+DEFAULT_MODEL_VERSION = "1"
+PROPERTY_NAMES = ("EngineeringUnits", "EURange")
+
+
+def parse_browse_path(path, ns):
+    """
+    "FanControl/CPUTemperature" -> QualifiedNames relative to the Objects folder.
+    Segments without prefix live in the server namespace `ns`, a numeric
+    prefix is taken as is (e.g. "0:CPUTemperature").
+    """
+    names = []
+    for segment in path.strip("/").split("/"):
+        idx, sep, name = segment.partition(":")
+        if sep and idx.isdigit():
+            names.append(ua.QualifiedName(name, int(idx)))
+        else:
+            names.append(ua.QualifiedName(segment, ns))
+    return names
+
+
+def _browse_path(names):
+    return ua.BrowsePath(
+        StartingNode=ua.NodeId(ua.ObjectIds.ObjectsFolder),
+        RelativePath=ua.RelativePath(Elements=[
+            ua.RelativePathElement(
+                ReferenceTypeId=ua.NodeId(ua.ObjectIds.HierarchicalReferences),
+                IsInverse=False,
+                IncludeSubtypes=True,
+                TargetName=name,
+            )
+            for name in names
+        ]),
+    )
+
+
+def _target(result):
+    if not result.StatusCode.is_good() or not result.Targets:
+        return None
+    target = result.Targets[0].TargetId
+    return ua.NodeId(target.Identifier, target.NamespaceIndex)
+
+
+async def discover_nodes(client, ns, paths):
+    """
+    Resolves all browse paths in ONE TranslateBrowsePathsToNodeIds request
+    (variables plus their EngineeringUnits/EURange properties) and reads the
+    property values in ONE Read request.
+    Returns {path: {"node_id": .., "unit": .., "eu_range": [low, high]}}.
+    """
+    requests = []  # (path, property or None, browse path)
+    for path in paths:
+        names = parse_browse_path(path, ns)
+        requests.append((path, None, _browse_path(names)))
+        for prop in PROPERTY_NAMES:
+            # Standard properties are in ns 0, some servers add them in their own ns
+            for prop_ns in (0, ns):
+                requests.append((path, prop, _browse_path(names + [ua.QualifiedName(prop, prop_ns)])))
+
+    results = await client.uaclient.translate_browsepaths_to_nodeids([r[2] for r in requests])
+
+    node_map = {}
+    props = []  # (path, property, nodeid)
+    for (path, prop, _), result in zip(requests, results):
+        nodeid = _target(result)
+        if nodeid is None:
+            continue
+        if prop is None:
+            node_map[path] = {"node_id": nodeid.to_string(), "unit": None, "eu_range": None}
+        elif not any(p[0] == path and p[1] == prop for p in props):
+            props.append((path, prop, nodeid))
+
+    if props:
+        data_values = await client.read_attributes(
+            [client.get_node(nodeid) for _, _, nodeid in props], ua.AttributeIds.Value
+        )
+        for (path, prop, _), dv in zip(props, data_values):
+            if path not in node_map or not dv.StatusCode.is_good():
+                continue
+            value = dv.Value.Value
+            if prop == "EngineeringUnits" and value is not None:
+                node_map[path]["unit"] = value.DisplayName.Text
+            elif prop == "EURange" and value is not None:
+                node_map[path]["eu_range"] = [value.Low, value.High]
+
+    for path in paths:
+        if path not in node_map:
+            logging.warning(f"OPC UA browse path not found: {path}")
+    return node_map
+
+
+class NodeMapCache:
+    """
+    Discovered node maps on disk, one entry per "namespace URI#model version".
+    The namespace index is stored as well; if the server assigns another
+    index the entry is rediscovered. Bump `model_version` in the config
+    after the server's address space changed.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring node map cache {path}: {e}")
+
+    @staticmethod
+    def key(namespace_uri, model_version):
+        return f"{namespace_uri}#{model_version}"
+
+    def get(self, key, ns, paths):
+        """Cached nodes for all paths, or None if anything has to be discovered."""
+        entry = self.entries.get(key)
+        if not entry or entry.get("namespace_index") != ns:
+            return None
+        if not all(path in entry["nodes"] for path in paths):
+            return None
+        return entry["nodes"]
+
+    def put(self, key, ns, nodes):
+        entry = self.entries.get(key)
+        if not entry or entry.get("namespace_index") != ns:
+            entry = self.entries[key] = {"namespace_index": ns, "nodes": {}}
+        entry["nodes"].update(nodes)
+        self._save()
+
+    def invalidate(self, key, paths):
+        """Drops stale paths (e.g. BadNodeIdUnknown) so they are rediscovered."""
+        entry = self.entries.get(key)
+        if not entry or not any(path in entry["nodes"] for path in paths):
+            return
+        for path in paths:
+            entry["nodes"].pop(path, None)
+        self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.warning(f"Could not write node map cache {self.path}: {e}")
@@ -1,69 +1,148 @@
 import asyncio
+import logging
+import time
 from datetime import datetime, timedelta
-import yaml
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter
 
 # UI Libraries
 from rich.live import Live
 from rich.panel import Panel
-from rich.table import Table
 from rich.layout import Layout
+from rich.text import Text
+
+from dashboard import EventLog, TagTable
+from plotting import HistoryBuffer, TerminalPlot, create_plot
+from config_watcher import ConfigWatcher, load_config
+from collector import ShardedCollector
+from capture import Recorder
+from store_forward import StoreAndForward
+from compression import TagCompressor
 
 # Drivers (Assuming these are in your drivers/ folder)
 from drivers.modbus_client import ModbusDriver
 from drivers.opcua_client import OpcUaDriver
 
+CONFIG_PATH = "config.yaml"
+CONFIG_CHECK_INTERVAL = 2  # s
+# Sections apply_config() can switch at runtime, all others need a restart
+LIVE_SECTIONS = {"modbus_connection", "modbus_tags", "opcua_connection", "opcua_tags"}
+HISTORY_KEYS = {"cpu": "CPU", "fan": "Fan", "amb": "Ambient"}  # series -> tag name part
+STALE_AFTER_S = 5          # Shared-memory values older than this are treated as missing
+
+def history_compression(tags):
+    """Per history series the `compression:` spec of the matching tag (None = default)."""
+    return {
+        key: next((t.get('compression') for t in tags if needle in t['name']), None)
+        for key, needle in HISTORY_KEYS.items()
+    }
+
 # Load Configuration
-with open("config.yaml", "r") as f:
-    config = yaml.safe_load(f)
+config = load_config(CONFIG_PATH)
 
 class MonitorApp:
     def __init__(self):
         self.modbus = ModbusDriver(config['modbus_connection'], config['modbus_tags'])
         self.opcua = OpcUaDriver(config['opcua_connection'], config['opcua_tags'])
-        
-        # Buffers for plotting
-        self.history_timestamps = []
-        self.history_mb = {"cpu": [], "fan": [], "amb": []}
-        self.history_ua = {"cpu": [], "fan": [], "amb": []}
-        
-        self.window_delta = timedelta(minutes=5)
 
-        # Initialize Matplotlib Figure with 1 row, 2 columns for Side-by-Side comparison
-        plt.style.use('dark_background')
-        self.fig, (self.ax1, self.ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        # Optional: record everything the drivers read (see replay.py / bench.py)
+        capture_cfg = config.get('capture') or {}
+        self.recorder = Recorder(capture_cfg['path']) if capture_cfg.get('path') else None
+        self._attach_recorder()
+        self._attach_events()
+
+        # Optional: export through a durable on-disk queue (store-and-forward)
+        export_cfg = config.get('export') or {}
+        self.exporter = StoreAndForward.from_config(export_cfg) if export_cfg.get('url') else None
+        # Same deadband / swinging door filtering in front of the persistent store
+        self.export_compressor = TagCompressor({
+            "modbus": config['modbus_tags'], "opcua": config['opcua_tags'],
+        })
+
+        # Optional: poll in worker processes, read results from shared memory
+        collector_cfg = config.get('collector') or {}
+        self.collector = None
+        if collector_cfg.get('mode') == 'sharded':
+            self.collector = ShardedCollector(config, workers=collector_cfg.get('workers'))
+            self.mb_device = collector_cfg.get('modbus_device', 'modbus')
+            self.ua_device = collector_cfg.get('opcua_device', 'opcua')
         
-        # Helper to setup identical styling for both protocol plots
-        def setup_pi_plot(ax, title, color_cpu, color_amb):
-            ax.set_ylim(10, 75)
-            ax.set_ylabel("Temperature °C")
-            ax.set_title(title)
-            ax.grid(True, alpha=0.1)
-            ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
-            
-            line_cpu, = ax.plot([], [], label="CPU Temp", color=color_cpu, linewidth=2)
-            line_amb, = ax.plot([], [], label="Ambient Temp", color=color_amb, linewidth=1.5, linestyle='--')
-            
-            # Fan Status on Secondary Axis
-            ax_fan = ax.twinx()
-            ax_fan.set_ylim(-0.1, 1.1)
-            ax_fan.set_yticks([0, 1])
-            ax_fan.set_yticklabels(['OFF', 'ON'])
-            line_fan, = ax_fan.step([], [], label="Fan", color="#FFD700", linewidth=2, where='post')
-            
-            ax.legend(loc="upper left", fontsize='small')
-            return line_cpu, line_amb, line_fan, ax_fan
-
-        # Setup Modbus Plot (Left)
-        self.ln_mb_cpu, self.ln_mb_amb, self.ln_mb_fan, self.ax_mb_fan = \
-            setup_pi_plot(self.ax1, "Modbus Pi", "#00CED1", "#008B8B")
-            
-        # Setup OPC UA Plot (Right)
-        self.ln_ua_cpu, self.ln_ua_amb, self.ln_ua_fan, self.ax_ua_fan = \
-            setup_pi_plot(self.ax2, "OPC UA Pi", "#FF4500", "#CD5C5C")
-
-        self.fig.tight_layout()
+        # Ring buffers for plotting
+        self.window_delta = timedelta(minutes=5)
+        self.history = HistoryBuffer(("mb", "ua"), window=self.window_delta, compression={
+            "mb": history_compression(config['modbus_tags']),
+            "ua": history_compression(config['opcua_tags']),
+        })
+
+        # Persistent table models, cells are only rewritten on value changes
+        self.mb_table = TagTable("MODBUS TCP")
+        self.ua_table = TagTable("OPC UA")
+        self.header = Text("Dual Protocol Monitor | --:--:--")
+        self.events = EventLog("OPC UA EVENTS")
+
+        # Plot backend: "terminal" (plotext inside the layout, default) or "matplotlib"
+        self.plot = create_plot(
+            config.get('plot_backend', 'terminal'),
+            self.history,
+            [("mb", "Modbus Pi"), ("ua", "OPC UA Pi")],
+        )
+        self.plot_in_layout = isinstance(self.plot, TerminalPlot)
+        self.plotted_version = None  # History version shown by the last refresh
+
+        # Live config reload (history, sessions and UI survive a change)
+        self.config = config
+        self.config_watcher = ConfigWatcher(CONFIG_PATH, config)
+
+    def _attach_recorder(self):
+        self.modbus.recorder = self.recorder
+        self.opcua.recorder = self.recorder
+
+    def _attach_events(self):
+        # One event subscription per OPC UA device instead of polling status variables
+        if (self.opcua.config.get('events') or {}).get('enabled'):
+            self.opcua.subscribe_events(self.events.add)
+
+    async def apply_config(self, new_config, changes):
+        """
+        Reconfigures only what changed: a new connection section replaces
+        that driver, a changed tag list is swapped into the running driver
+        (keeps the open connection, recompiles its read plan) and gets new
+        compression filters. Every other section is logged as needing a restart.
+        """
+        if self.collector:
+            logging.warning(f"Config changes in sharded collector mode need a restart: {', '.join(sorted(changes))}")
+            self.config = new_config
+            return
+
+        if 'modbus_connection' in changes:
+            self.modbus.close()
+            self.modbus = ModbusDriver(new_config['modbus_connection'], new_config['modbus_tags'])
+            self.mb_table.reset()
+        elif 'modbus_tags' in changes:
+            self.modbus.set_tags(new_config['modbus_tags'])
+            self.mb_table.reset()
+
+        if 'opcua_connection' in changes:
+            await self.opcua.disconnect()
+            self.opcua = OpcUaDriver(new_config['opcua_connection'], new_config['opcua_tags'])
+            self.ua_table.reset()
+        elif 'opcua_tags' in changes:
+            self.opcua.set_tags(new_config['opcua_tags'])
+            self.ua_table.reset()
+
+        # Compression specs live in the tag lists
+        for section, dev, device in (("modbus_tags", "mb", "modbus"), ("opcua_tags", "ua", "opcua")):
+            if section in changes:
+                self.history.set_compression(dev, history_compression(new_config[section]))
+                flushed = self.export_compressor.set_tags(device, new_config[section])
+                if self.exporter:
+                    self.exporter.put_points(device, flushed)
+
+        self._attach_recorder()
+        if 'opcua_connection' in changes:
+            self._attach_events()
+        restart = changes - LIVE_SECTIONS
+        if restart:
+            logging.warning(f"Config changes need a restart: {', '.join(sorted(restart))}")
+        self.config = new_config
 
     def make_layout(self) -> Layout:
         """Defines the visual structure of the dashboard."""
@@ -71,103 +150,101 @@ class MonitorApp:
         layout.split_column(
             Layout(name="header", size=3),
             Layout(name="main", size=12),
+            Layout(name="events", size=7),
             Layout(name="info", size=3)
         )
         layout["main"].split_row(
             Layout(name="modbus_pane"),
             Layout(name="opcua_pane")
         )
+        if self.plot_in_layout:
+            layout["info"].size = None  # Let the plot take the remaining height
+            layout["info"].update(Panel(self.plot, title="Trend (5 min)"))
+        # Renderables are attached once and mutated in place afterwards
+        layout["header"].update(Panel(self.header, style="bold white on blue"))
+        layout["modbus_pane"].update(self.mb_table.panel)
+        layout["opcua_pane"].update(self.ua_table.panel)
+        layout["events"].update(self.events.panel)
         return layout
 
-    def generate_table(self, data):
-        """Unified table format - UI is protocol-agnostic."""
-        table = Table(expand=True, border_style="white", box=None)
-        if not data:
-            table.add_row("Connecting...", "", "")
-            return table
-
-        table.add_column("Parameter", style="cyan")
-        table.add_column("Value", justify="right", style="bold green")
-        table.add_column("Unit", style="dim")
-
-        unit_map = {"Ambient Temp": "°C", "Humidity": "%", "CPU Temp": "°C"}
-
-        for d in data:
-            if "Gas" in d.name: continue # Hide gas as requested
-                
-            if isinstance(d.value, bool):
-                val_str = "RUNNING" if d.value else "STOPPED"
-                if "Status" not in d.name and "Fan" not in d.name: 
-                    val_str = "ENABLED" if d.value else "PAUSED"
-                style = "bold green" if d.value else "bold red"
-                table.add_row(d.name, val_str, "", style=style)
-            else:
-                unit = unit_map.get(d.name, "")
-                table.add_row(d.name, f"{d.value:.1f}", unit)
-        return table
-
     async def run(self):
         layout = self.make_layout()
-        plt.ion()
-        plt.show()
         
-        with Live(layout, refresh_per_second=2, screen=True) as live:
-            while True:
-                now = datetime.now()
-                mb_data = self.modbus.read_all()
-                ua_data = await self.opcua.read_all()
-                
-                # Update Plot Buffers
-                self.history_timestamps.append(now)
-                
-                def get_val(data, key):
-                    return next((d.value for d in data if key in d.name), 0)
-
-                if mb_data:
-                    self.history_mb["cpu"].append(get_val(mb_data, "CPU"))
-                    self.history_mb["fan"].append(1 if get_val(mb_data, "Fan") else 0)
-                    self.history_mb["amb"].append(get_val(mb_data, "Ambient"))
-
-                if ua_data:
-                    self.history_ua["cpu"].append(get_val(ua_data, "CPU"))
-                    self.history_ua["fan"].append(1 if get_val(ua_data, "Fan") else 0)
-                    self.history_ua["amb"].append(get_val(ua_data, "Ambient"))
-                else:
-                    self.history_ua["cpu"].append(0)
-                    self.history_ua["fan"].append(0)
-                    self.history_ua["amb"].append(0)
+        if self.collector:
+            self.collector.start()
+        if self.exporter:
+            self.exporter.start()
+
+        # No refresh timer: the screen is redrawn only when data changed
+        with Live(layout, auto_refresh=False, screen=True) as live:
+            try:
+                last_config_check = datetime.now()
+                while True:
+                    now = datetime.now()
+                    if (now - last_config_check).total_seconds() >= CONFIG_CHECK_INTERVAL:
+                        last_config_check = now
+                        reload = self.config_watcher.poll()
+                        if reload:
+                            try:
+                                await self.apply_config(*reload)
+                            except Exception as e:
+                                # Keep monitoring with the running config
+                                logging.error(f"Config reload failed, keeping the running config: {e}")
+                            else:
+                                self.config_watcher.accept(reload[0])
+                    if self.collector:
+                        # Zero-copy read of the latest values published by the shards
+                        mb_data = self.collector.read_device(self.mb_device, max_age=STALE_AFTER_S)
+                        ua_data = self.collector.read_device(self.ua_device, max_age=STALE_AFTER_S)
+                    else:
+                        mb_data = self.modbus.read_all()
+                        ua_data = await self.opcua.read_all()
                 
-                # Trim Window (5 mins)
-                cutoff = now - self.window_delta
-                while self.history_timestamps and self.history_timestamps[0] < cutoff:
-                    self.history_timestamps.pop(0)
-                    for buf in [self.history_mb, self.history_ua]:
-                        buf["cpu"].pop(0); buf["fan"].pop(0); buf["amb"].pop(0)
-
-                # Update Matplotlib Lines
-                if self.history_timestamps:
-                    self.ln_mb_cpu.set_data(self.history_timestamps, self.history_mb["cpu"])
-                    self.ln_mb_amb.set_data(self.history_timestamps, self.history_mb["amb"])
-                    self.ln_mb_fan.set_data(self.history_timestamps, self.history_mb["fan"])
-                    self.ln_ua_cpu.set_data(self.history_timestamps, self.history_ua["cpu"])
-                    self.ln_ua_amb.set_data(self.history_timestamps, self.history_ua["amb"])
-                    self.ln_ua_fan.set_data(self.history_timestamps, self.history_ua["fan"])
-                    
-                    self.ax1.set_xlim(now - self.window_delta, now)
-                    self.ax2.set_xlim(now - self.window_delta, now)
-                    self.fig.canvas.draw()
-                    self.fig.canvas.flush_events()
-
-                # Update Rich UI
-                layout["header"].update(Panel(f"Dual Protocol Monitor | {now.strftime('%H:%M:%S')}", style="bold white on blue"))
-                layout["modbus_pane"].update(Panel(self.generate_table(mb_data), title="MODBUS TCP"))
-                layout["opcua_pane"].update(Panel(self.generate_table(ua_data), title="OPC UA"))
+                    # Update Plot Buffers
+                    def get_val(data, key):
+                        return next((d.value for d in data if key in d.name), 0)
+
+                    def sample(data):
+                        if not data:
+                            return None # Outage: leave a gap instead of recording zeros
+                        values = {key: get_val(data, needle) for key, needle in HISTORY_KEYS.items()}
+                        values["fan"] = 1 if values["fan"] else 0
+                        return values
+
+                    self.history.append(now, {"mb": sample(mb_data), "ua": sample(ua_data)})
+
+                    # Queue on disk first, the exporter drains when upstream is reachable
+                    if self.exporter:
+                        ts = time.time()
+                        for device, data in (("modbus", mb_data), ("opcua", ua_data)):
+                            self.exporter.put_points(device, self.export_compressor.compress(ts, device, data))
+                    self.plot.update(now)
+
+                    # Update Rich UI (changed cells only)
+                    mb_changed = self.mb_table.update(mb_data)
+                    ua_changed = self.ua_table.update(ua_data)
+                    events_changed = self.events.update()
+                    # The chart only needs a redraw if the stored history changed
+                    plot_changed = self.plot_in_layout and self.history.version != self.plotted_version
+                    if mb_changed or ua_changed or events_changed or plot_changed:
+                        self.plotted_version = self.history.version
+                        self.header.plain = f"Dual Protocol Monitor | {now.strftime('%H:%M:%S')}"
+                        live.refresh()
                 
-                await asyncio.sleep(1)
+                    await asyncio.sleep(1)
+            finally:
+                # Close the OPC UA session cleanly (also on Ctrl+C)
+                await self.opcua.disconnect()
+                if self.collector:
+                    self.collector.stop()
+                if self.recorder:
+                    self.recorder.close()
+                if self.exporter:
+                    await self.exporter.stop()
 
 if __name__ == "__main__":
     app = MonitorApp()
     try:
         asyncio.run(app.run())
     except KeyboardInterrupt:
-        plt.close()
\ No newline at end of file
+        app.plot.close()
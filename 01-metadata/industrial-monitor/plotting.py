@@ -0,0 +1,259 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta
+
+from rich.text import Text
+
+from compression import default_spec, make_filter
+
+SERIES = ("cpu", "fan", "amb")
+STEP_SERIES = ("fan",)  # Booleans: change-only storage, drawn as steps
+GAP = float("nan")  # Marks samples of an outage, renderers leave a hole
+MAX_PLOT_POINTS = 120  # Upper bound of points handed to a renderer per series
+
+
+class HistoryBuffer:
+    """
+    Fixed size ring buffers for the plot history of all devices.
+    Every series runs through its compression filter (swinging door for
+    analog values, change-only deadband for the fan) before a point is
+    stored, so a slowly drifting signal keeps a handful of points instead
+    of one per second. Old points drop out by themselves (deque maxlen) in
+    addition to the time based trim.
+    """
+    def __init__(self, devices, window=timedelta(minutes=5), period_s=1.0, compression=None):
+        self.window = window
+        size = int(window.total_seconds() / period_s) + 2
+        compression = compression or {}
+        self.specs = {dev: dict(compression.get(dev) or {}) for dev in devices}
+        self.series = {
+            dev: {key: (deque(maxlen=size), self._make_filter(dev, key)) for key in SERIES}
+            for dev in devices
+        }
+        self.latest = None
+        self.version = 0  # Bumped when stored points change, lets renderers skip redraws
+
+    def _make_filter(self, dev, key):
+        return make_filter(self.specs[dev].get(key) or default_spec(key in STEP_SERIES))
+
+    def set_compression(self, dev, specs):
+        """
+        New compression specs of one device (config reload). Only series with
+        a changed spec get a new filter; their not yet archived point is
+        stored first, so the trend has no hole.
+        """
+        for key in SERIES:
+            if specs.get(key) == self.specs[dev].get(key):
+                continue
+            self.specs[dev][key] = specs.get(key)
+            points, compressor = self.series[dev][key]
+            tail = compressor.pending()
+            if tail is not None:
+                points.append(tail)
+            self.series[dev][key] = (points, self._make_filter(dev, key))
+        self.version += 1
+
+    def append(self, now, values):
+        """
+        values: {device: {"cpu": .., "fan": .., "amb": ..}}
+        A device without a sample (outage) gets a gap, not a fake zero.
+        """
+        t = now.timestamp()
+        self.latest = now
+        changed = False
+        for dev, buffers in self.series.items():
+            sample = values.get(dev) or {}
+            for key, (points, compressor) in buffers.items():
+                new_points = compressor.offer(t, float(sample.get(key, GAP)))
+                if new_points:
+                    points.extend(new_points)
+                    changed = True
+        # Samples absorbed by the filters change nothing visible: no redraw
+        if self.trim(now) or changed:
+            self.version += 1
+
+    def trim(self, now):
+        """Drops points left of the window, returns True if any were removed."""
+        # Keep one point left of the window so lines enter it correctly
+        cutoff = (now - self.window).timestamp()
+        removed = False
+        for buffers in self.series.values():
+            for points, _ in buffers.values():
+                while len(points) > 1 and points[1][0] < cutoff:
+                    points.popleft()
+                    removed = True
+        return removed
+
+    def stored_points(self):
+        return sum(len(points) for buffers in self.series.values() for points, _ in buffers.values())
+
+    def view(self, dev, max_points=MAX_PLOT_POINTS):
+        """
+        Copy of one device's history as {key: (timestamps, values)} with
+        epoch-second timestamps, including the not yet archived live point.
+        Above max_points, buckets of `step` points are reduced to one
+        (mean for analog values, max for the fan so short ON phases stay).
+        """
+        out = {}
+        for key, (points, compressor) in self.series[dev].items():
+            pts = list(points)
+            tail = compressor.pending()
+            if tail is not None:
+                pts.append(tail)
+            step = max(1, math.ceil(len(pts) / max_points))
+            if step > 1:
+                reduce = max if key in STEP_SERIES else (lambda b: sum(b) / len(b))
+                decimated = []
+                for i in range(0, len(pts), step):
+                    bucket = [v for _, v in pts[i:i + step] if not math.isnan(v)]
+                    decimated.append((pts[i][0], reduce(bucket) if bucket else GAP))
+                pts = decimated
+            out[key] = ([t for t, _ in pts], [v for _, v in pts])
+        return out
+
+
+def step_points(x, y):
+    """Step interpolation (hold last value) for boolean series."""
+    sx, sy = [], []
+    for i, (xi, yi) in enumerate(zip(x, y)):
+        if i:
+            sx.append(xi)
+            sy.append(y[i - 1])
+        sx.append(xi)
+        sy.append(yi)
+    return sx, sy
+
+
+class TerminalPlot:
+    """
+    plotext renderer living inside the rich Layout, works over SSH.
+    The chart is rebuilt only if the history or the region size changed.
+    """
+    def __init__(self, history, panes):
+        import plotext  # Small, pure python - no GUI toolkit involved
+        self.plt = plotext
+        self.history = history
+        self.panes = panes  # [(device, title), ...]
+        self._cache_key = None
+        self._cache = Text("")
+
+    def update(self, now):
+        pass # Drawn lazily by rich when the layout is refreshed
+
+    def close(self):
+        pass
+
+    def _build(self, width, height):
+        plt = self.plt
+        # Full reset (subplots, legends), then the grid, then its size:
+        # plotext ignores a plotsize set before subplots()
+        plt.clear_figure()
+        plt.subplots(1, len(self.panes))
+        plt.plotsize(width, height)
+        plt.theme("dark")
+        for col, (dev, title) in enumerate(self.panes, start=1):
+            plt.subplot(1, col)
+            plt.title(title)
+            if self.history.latest is None:
+                continue
+            data = self.history.view(dev, max_points=max(10, width // len(self.panes)))
+            now = self.history.latest.timestamp()
+
+            def valid(key):
+                # plotext cannot draw NaN, so outage samples are left out
+                timestamps, values = data[key]
+                pairs = [(t - now, v) for t, v in zip(timestamps, values) if not math.isnan(v)]
+                x, y = [p[0] for p in pairs], [p[1] for p in pairs]
+                return step_points(x, y) if key in STEP_SERIES else (x, y)
+
+            plt.ylim(10, 75)
+            plt.xlim(-self.history.window.total_seconds(), 0)
+            plt.plot(*valid("cpu"), label="CPU Temp", marker="braille")
+            plt.plot(*valid("amb"), label="Ambient Temp", marker="braille")
+            plt.plot(*valid("fan"), label="Fan", yside="right", marker="braille")
+            plt.ylim(-0.1, 1.1, yside="right")
+            plt.xlabel("seconds")
+        return plt.build()
+
+    def __rich_console__(self, console, options):
+        width = options.max_width
+        height = options.height or 20
+        key = (self.history.version, width, height)
+        if key != self._cache_key:
+            self._cache = Text.from_ansi(self._build(width, height))
+            self._cache_key = key
+        yield self._cache
+
+
+class MatplotlibPlot:
+    """
+    Opt-in desktop window (plot_backend: "matplotlib"). matplotlib is only
+    imported here, so the terminal backend never pays for it.
+    """
+    def __init__(self, history, panes):
+        import matplotlib.pyplot as plt
+        from matplotlib.dates import DateFormatter
+        self.plt = plt
+        self.history = history
+        self.lines = {}
+
+        # Initialize Matplotlib Figure with 1 row, N columns for Side-by-Side comparison
+        plt.style.use('dark_background')
+        self.fig, axes = plt.subplots(1, len(panes), figsize=(15, 6))
+        self.axes = list(axes) if len(panes) > 1 else [axes]
+        colors = {"mb": ("#00CED1", "#008B8B"), "ua": ("#FF4500", "#CD5C5C")}
+
+        # Helper to setup identical styling for both protocol plots
+        for ax, (dev, title) in zip(self.axes, panes):
+            color_cpu, color_amb = colors.get(dev, ("#00CED1", "#008B8B"))
+            ax.set_ylim(10, 75)
+            ax.set_ylabel("Temperature °C")
+            ax.set_title(title)
+            ax.grid(True, alpha=0.1)
+            ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
+
+            line_cpu, = ax.plot([], [], label="CPU Temp", color=color_cpu, linewidth=2)
+            line_amb, = ax.plot([], [], label="Ambient Temp", color=color_amb, linewidth=1.5, linestyle='--')
+
+            # Fan Status on Secondary Axis
+            ax_fan = ax.twinx()
+            ax_fan.set_ylim(-0.1, 1.1)
+            ax_fan.set_yticks([0, 1])
+            ax_fan.set_yticklabels(['OFF', 'ON'])
+            line_fan, = ax_fan.step([], [], label="Fan", color="#FFD700", linewidth=2, where='post')
+
+            ax.legend(loc="upper left", fontsize='small')
+            self.lines[dev] = {"cpu": line_cpu, "amb": line_amb, "fan": line_fan}
+
+        self.fig.tight_layout()
+        plt.ion()
+        plt.show()
+
+    def update(self, now):
+        if self.history.latest is None:
+            return
+        for dev, lines in self.lines.items():
+            data = self.history.view(dev)
+            for key, line in lines.items():
+                timestamps, values = data[key]
+                line.set_data([datetime.fromtimestamp(t) for t in timestamps], values)
+        for ax in self.axes:
+            ax.set_xlim(now - self.history.window, now)
+        self.fig.canvas.draw()
+        self.fig.canvas.flush_events()
+
+    def close(self):
+        self.plt.close()
+
+
+PLOT_BACKENDS = {
+    "terminal": TerminalPlot,
+    "matplotlib": MatplotlibPlot,
+}
+
+
+def create_plot(name, history, panes):
+    try:
+        return PLOT_BACKENDS[name](history, panes)
+    except KeyError:
+        raise ValueError(f"Unknown plot_backend '{name}' (use one of {', '.join(PLOT_BACKENDS)})")
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import logging
+
+from asyncua import Server, ua
+from pymodbus.server import StartAsyncTcpServer as modbus_server
+from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext
+from pymodbus.datastore import ModbusSequentialDataBlock
+
+from capture import load_recording
+from drivers.opcua_discovery import parse_browse_path
+
+REGISTER_COUNT = 200
+MODBUS_PORT = 5020
+OPCUA_PORT = 4841
+
+class ReplayServers:
+    """
+    Local stand-ins for the recorded devices: a Modbus TCP server with one
+    unit per recorded unit ID and an OPC UA server exposing the recorded
+    NodeIds (discovered ones again below their recorded browse path).
+    replay() feeds the captured values back with the original timing,
+    divided by `speed` (e.g. 100 -> 100x faster).
+    """
+    def __init__(self, events, host="127.0.0.1", modbus_port=MODBUS_PORT, opcua_port=OPCUA_PORT):
+        self.events = events
+        self.host = host
+        self.modbus_port = modbus_port
+        self.opcua_port = opcua_port
+        self.blocks = {}
+        self.ua_nodes = {}
+        self.ua_server = None
+        self._tasks = []
+
+    @property
+    def opcua_url(self):
+        return f"opc.tcp://{self.host}:{self.opcua_port}/replay/"
+
+    async def _start_modbus(self):
+        units = sorted({e["unit"] for e in self.events if e["kind"] == "modbus"})
+        if not units:
+            return
+        devices = {}
+        for unit in units:
+            self.blocks[unit] = ModbusSequentialDataBlock(0, [0] * REGISTER_COUNT)
+            devices[unit] = ModbusDeviceContext(hr=self.blocks[unit])
+        context = ModbusServerContext(devices=devices, single=False)
+        self._tasks.append(asyncio.create_task(
+            modbus_server(context=context, address=(self.host, self.modbus_port))
+        ))
+
+    async def _start_opcua(self):
+        node_ids = {}
+        for e in self.events:
+            if e["kind"] == "opcua":
+                node_ids.setdefault(e["node_id"], e)
+        if not node_ids:
+            return
+        # Discovered nodes (browse_path tags) are rebuilt at their recorded place
+        meta = {e["node_id"]: e for e in self.events if e["kind"] == "opcua_node"}
+        server = Server()
+        await server.init()
+        server.set_endpoint(self.opcua_url)
+        server.set_server_name("Replay Server")
+        server.set_security_policy([ua.SecurityPolicyType.NoSecurity])
+
+        # Recorded NodeIds keep their namespace index, so fill the namespace
+        # array up to it, with the recorded URIs at their original index
+        parsed = {raw: ua.NodeId.from_string(raw) for raw in node_ids}
+        uris = {m["namespace_index"]: m["namespace_uri"] for m in meta.values()}
+        max_ns = max(nid.NamespaceIndex for nid in parsed.values())
+        namespaces = await server.get_namespace_array()
+        while len(namespaces) <= max_ns:
+            idx = len(namespaces)
+            await server.register_namespace(uris.get(idx, f"urn:replay:ns{idx}"))
+            namespaces = await server.get_namespace_array()
+        for idx, uri in uris.items():
+            if namespaces[idx] != uri:
+                logging.warning(f"Namespace {idx} is {namespaces[idx]} in the replay, recorded: {uri}")
+
+        replay_obj = await server.nodes.objects.add_object(1, "Replay")
+        folders = {}
+        for raw, nid in parsed.items():
+            first = node_ids[raw]
+            vtype = ua.VariantType[first["type"]]
+            if raw in meta:
+                node = await self._add_browse_path_node(server, folders, nid, meta[raw], first["value"], vtype)
+            else:
+                node = await replay_obj.add_variable(nid, raw, first["value"], vtype)
+            self.ua_nodes[raw] = (node, vtype)
+        await server.start()
+        self.ua_server = server
+
+    async def _add_browse_path_node(self, server, folders, nid, meta, value, vtype):
+        names = parse_browse_path(meta["browse_path"], meta["namespace_index"])
+        parent = server.nodes.objects
+        for depth, name in enumerate(names[:-1], start=1):
+            key = tuple((n.NamespaceIndex, n.Name) for n in names[:depth])
+            if key not in folders:
+                folders[key] = await parent.add_object(ua.NodeId(0, name.NamespaceIndex), name)
+            parent = folders[key]
+        node = await parent.add_variable(nid, names[-1], value, vtype)
+        # Standard properties (ns 0), read by the driver's discovery
+        if meta.get("unit"):
+            unit = ua.EUInformation()
+            unit.DisplayName = ua.LocalizedText(meta["unit"])
+            await node.add_property(
+                ua.NodeId(0, nid.NamespaceIndex), ua.QualifiedName("EngineeringUnits", 0), unit
+            )
+        if meta.get("eu_range"):
+            low, high = meta["eu_range"]
+            await node.add_property(
+                ua.NodeId(0, nid.NamespaceIndex), ua.QualifiedName("EURange", 0), ua.Range(Low=low, High=high)
+            )
+        return node
+
+    async def start(self):
+        await self._start_modbus()
+        await self._start_opcua()
+        # Give the Modbus listener a moment to bind
+        await asyncio.sleep(0.1)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self.ua_server:
+            await self.ua_server.stop()
+
+    async def apply(self, event):
+        if event["kind"] == "modbus":
+            # Same +1 shift as the device servers' datastore mapping
+            self.blocks[event["unit"]].setValues(event["start"] + 1, event["registers"])
+        elif event["kind"] == "opcua":
+            node, vtype = self.ua_nodes[event["node_id"]]
+            await node.write_value(ua.Variant(event["value"], vtype))
+
+    async def replay(self, speed=1.0, loop=False):
+        if not self.events:
+            return
+        t0 = self.events[0]["t"]
+        while True:
+            start = asyncio.get_running_loop().time()
+            for event in self.events:
+                delay = (event["t"] - t0) / speed - (asyncio.get_running_loop().time() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.apply(event)
+            if not loop:
+                return
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Serve a capture file through local Modbus/OPC UA servers.")
+    parser.add_argument("capture", help="File written with capture.path in config.yaml")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (e.g. 100)")
+    parser.add_argument("--loop", action="store_true", help="Start over at the end of the capture")
+    parser.add_argument("--modbus-port", type=int, default=MODBUS_PORT)
+    parser.add_argument("--opcua-port", type=int, default=OPCUA_PORT)
+    args = parser.parse_args()
+
+    servers = ReplayServers(load_recording(args.capture),
+                            modbus_port=args.modbus_port, opcua_port=args.opcua_port)
+    await servers.start()
+    print(f"Replaying {len(servers.events)} events at {args.speed}x "
+          f"(Modbus :{args.modbus_port}, OPC UA {servers.opcua_url})")
+    try:
+        await servers.replay(args.speed, args.loop)
+    finally:
+        await servers.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nShutting down...")
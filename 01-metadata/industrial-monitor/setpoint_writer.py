@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+
+from asyncua import ua
+from pymodbus.client import AsyncModbusTcpClient
+from rich.console import Console
+from rich.table import Table
+
+from collector import build_devices
+from config_watcher import load_config
+from drivers.opcua_client import OpcUaDriver
+
+MAX_PARALLEL = 32
+FAN_NAMESPACE = "urn:fan:control:opc-ua:server"
+
+# Modbus map of the fan controller (see 02-security/modbus-app/interface_docs.md)
+MODBUS_SETPOINTS = {
+    "HighThreshold": {"register": 31, "scale": 10},
+    "LowThreshold": {"register": 32, "scale": 10},
+    "ManualOverride": {"register": 35, "scale": 1},
+}
+SETPOINT_TYPES = {
+    "HighThreshold": ua.VariantType.Double,
+    "LowThreshold": ua.VariantType.Double,
+    "ManualOverride": ua.VariantType.Boolean,
+}
+
+
+def modbus_write_blocks(setpoints):
+    """
+    Contiguous registers become one FC16 request each, e.g. High/Low (31, 32)
+    in one write. Read-only registers in between are never written.
+    """
+    regs = sorted(
+        (MODBUS_SETPOINTS[name]["register"], int(round(float(value) * MODBUS_SETPOINTS[name]["scale"])))
+        for name, value in setpoints.items()
+    )
+    blocks = []
+    for reg, raw in regs:
+        if blocks and blocks[-1][0] + len(blocks[-1][1]) == reg:
+            blocks[-1][1].append(raw)
+        else:
+            blocks.append((reg, [raw]))
+    return blocks
+
+
+async def write_modbus(device, setpoints):
+    conn = device['connection']
+    client = AsyncModbusTcpClient(conn['host'], port=conn['port'])
+    await client.connect()
+    if not client.connected:
+        raise ConnectionError(f"Cannot connect to {conn['host']}:{conn['port']}")
+    try:
+        for start, values in modbus_write_blocks(setpoints):
+            resp = await client.write_registers(start, values, device_id=conn['device_id'])
+            if resp.isError():
+                raise RuntimeError(f"Write {start}..{start + len(values) - 1} rejected: {resp}")
+
+        # Verify with ONE batched read over the whole setpoint range
+        regs = [MODBUS_SETPOINTS[name]["register"] for name in setpoints]
+        first = min(regs)
+        resp = await client.read_holding_registers(first, count=max(regs) - first + 1, device_id=conn['device_id'])
+        if resp.isError():
+            raise RuntimeError(f"Read-back failed: {resp}")
+        return {
+            name: resp.registers[MODBUS_SETPOINTS[name]["register"] - first] / MODBUS_SETPOINTS[name]["scale"]
+            for name in setpoints
+        }
+    finally:
+        client.close()
+
+
+async def write_opcua(device, setpoints):
+    # The driver brings the security/identity handling (e.g. user "manager")
+    driver = OpcUaDriver(device['connection'], [])
+    await driver.connect()
+    try:
+        client = driver.client
+        ns = await client.get_namespace_index(device['connection'].get('namespace_uri', FAN_NAMESPACE))
+        fan = await client.nodes.objects.get_child(f"{ns}:FanControl")
+        # ONE Browse + ONE Read of the browse names (the threshold nodes carry
+        # string NodeIds, ManualOverride a numeric one)
+        children = await fan.get_children()
+        browse_names = await client.read_attributes(children, ua.AttributeIds.BrowseName)
+        by_name = {dv.Value.Value.Name: node for node, dv in zip(children, browse_names)}
+        missing = [name for name in setpoints if name not in by_name]
+        if missing:
+            raise LookupError(f"Not found under FanControl: {', '.join(missing)}")
+        nodes = [by_name[name] for name in setpoints]
+        values = [
+            ua.DataValue(ua.Variant(
+                bool(value) if SETPOINT_TYPES[name] == ua.VariantType.Boolean else float(value),
+                SETPOINT_TYPES[name],
+            ))
+            for name, value in setpoints.items()
+        ]
+        # ONE Write service call for all nodes, per item status in the result
+        results = await client.write_values(nodes, values, raise_on_partial_error=False)
+        bad = [f"{name}: {status.name}" for name, status in zip(setpoints, results) if not status.is_good()]
+        if bad:
+            raise RuntimeError("Write rejected - " + ", ".join(bad))
+
+        # Verify with ONE batched Read
+        read_back = await client.read_values(nodes)
+        return dict(zip(setpoints, read_back))
+    finally:
+        await driver.disconnect()
+
+
+async def write_device(device, setpoints, semaphore):
+    async with semaphore:
+        try:
+            writer = write_modbus if device['protocol'] == 'modbus' else write_opcua
+            read_back = await writer(device, setpoints)
+        except Exception as e:
+            return device, False, str(e)
+        mismatch = [
+            name for name, value in setpoints.items()
+            if abs(float(read_back[name]) - float(value)) > 1e-6
+        ]
+        if mismatch:
+            return device, False, f"Read-back differs: {', '.join(mismatch)}"
+        return device, True, "OK"
+
+
+async def write_fleet(devices, setpoints, max_parallel=MAX_PARALLEL):
+    """Pushes the same setpoints to all devices, at most max_parallel at a time."""
+    semaphore = asyncio.Semaphore(max_parallel)
+    return await asyncio.gather(*(write_device(d, setpoints, semaphore) for d in devices))
+
+
+def validate_setpoints(setpoints):
+    """Same limits as the servers (EURange / ValidatingDataBlock), checked before touching the fleet."""
+    high = setpoints.get("HighThreshold")
+    low = setpoints.get("LowThreshold")
+    if high is not None and not 0.0 <= high <= 65.0:
+        return "HighThreshold must be within 0.0 .. 65.0 °C"
+    if low is not None and not 0.0 <= low <= 55.0:
+        return "LowThreshold must be within 0.0 .. 55.0 °C"
+    if high is not None and low is not None and low >= high:
+        return "LowThreshold must be below HighThreshold"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write thresholds / manual override to many devices at once.")
+    parser.add_argument("--config", default="config.yaml", help="Device list (devices: or the modbus/opcua sections)")
+    parser.add_argument("--high", type=float, help="High threshold [°C]")
+    parser.add_argument("--low", type=float, help="Low threshold [°C]")
+    parser.add_argument("--manual", type=int, choices=[0, 1], help="Manual override")
+    parser.add_argument("--device", action="append", help="Only these device names (repeatable)")
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL, help="Max devices written concurrently")
+    args = parser.parse_args()
+
+    setpoints = {}
+    if args.high is not None:
+        setpoints["HighThreshold"] = args.high
+    if args.low is not None:
+        setpoints["LowThreshold"] = args.low
+    if args.manual is not None:
+        setpoints["ManualOverride"] = args.manual
+    if not setpoints:
+        parser.error("Nothing to write, use --high/--low/--manual")
+    error = validate_setpoints(setpoints)
+    if error:
+        parser.error(error)
+
+    devices = build_devices(load_config(args.config))
+    if args.device:
+        devices = [d for d in devices if d['name'] in args.device]
+
+    results = asyncio.run(write_fleet(devices, setpoints, args.parallel))
+
+    table = Table(title=f"Setpoints {setpoints}")
+    table.add_column("Device", style="cyan")
+    table.add_column("Protocol")
+    table.add_column("Result")
+    for device, ok, message in results:
+        table.add_row(device['name'], device['protocol'], message, style="green" if ok else "bold red")
+    Console().print(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import asyncio
+import gzip
+import json
+import logging
+import sqlite3
+import time
+import urllib.request
+
+QUEUE_PATH = "outbox.sqlite"
+MAX_ROWS = 1_000_000       # ~ 11 days of 1 s samples for 1 device with 5 tags
+BATCH_SIZE = 500
+MAX_BYTES_PER_S = 20_000   # Drain budget on the uplink (compressed bytes)
+RETRY_DELAY_S = 5.0
+
+# Back-pressure policies when the queue is full
+DROP_OLDEST = "drop_oldest"  # Keep the newest data (default, trends stay current)
+DROP_NEWEST = "drop_newest"  # Keep the oldest data, reject new samples
+
+
+class DurableQueue:
+    """
+    Bounded on-disk FIFO of readouts (SQLite in WAL mode, survives restarts
+    and power loss). Rows are only deleted after the sink acknowledged them.
+    """
+    def __init__(self, path=QUEUE_PATH, max_rows=MAX_ROWS, policy=DROP_OLDEST):
+        self.max_rows = max_rows
+        self.policy = policy
+        self.dropped = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " ts REAL NOT NULL, device TEXT NOT NULL, tag TEXT NOT NULL, value REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS outbox_ts ON outbox (ts, id)")
+        self.db.commit()
+        self.count = self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def put(self, ts, device, readouts):
+        """Appends all readouts of one poll in a single transaction."""
+        self.put_rows([(ts, device, r.name, float(r.value)) for r in readouts])
+
+    def put_rows(self, rows):
+        """rows: [(ts, device, tag, value), ...] in a single transaction."""
+        if not rows:
+            return
+        overflow = self.count + len(rows) - self.max_rows
+        if overflow > 0:
+            if self.policy == DROP_NEWEST:
+                self.dropped += len(rows)
+                return
+            if len(rows) > self.max_rows:
+                # The batch alone exceeds the bound: keep its newest rows only
+                self.dropped += len(rows) - self.max_rows
+                rows = sorted(rows, key=lambda row: row[0])[-self.max_rows:]
+                overflow = self.count + len(rows) - self.max_rows
+            cursor = self.db.execute(
+                "DELETE FROM outbox WHERE id IN (SELECT id FROM outbox ORDER BY ts, id LIMIT ?)", (overflow,)
+            )
+            # Count what was really deleted, the table may hold fewer rows
+            self.count -= cursor.rowcount
+            self.dropped += cursor.rowcount
+        self.db.executemany("INSERT INTO outbox (ts, device, tag, value) VALUES (?, ?, ?, ?)", rows)
+        self.db.commit()
+        self.count += len(rows)
+
+    def peek(self, limit=BATCH_SIZE):
+        """Oldest rows first - batches go out time-ordered."""
+        return self.db.execute(
+            "SELECT id, ts, device, tag, value FROM outbox ORDER BY ts, id LIMIT ?", (limit,)
+        ).fetchall()
+
+    def ack(self, rows):
+        # Rows of the batch may already be gone (drop_oldest during the upload)
+        cursor = self.db.executemany("DELETE FROM outbox WHERE id = ?", [(row[0],) for row in rows])
+        self.db.commit()
+        self.count -= cursor.rowcount
+
+    def close(self):
+        self.db.close()
+
+
+def encode_batch(rows):
+    """gzip compressed JSON, columns instead of records to help compression."""
+    payload = {
+        "ts": [row[1] for row in rows],
+        "device": [row[2] for row in rows],
+        "tag": [row[3] for row in rows],
+        "value": [row[4] for row in rows],
+    }
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+
+class HttpSink:
+    """POSTs compressed batches to an HTTP endpoint (stdlib only)."""
+    def __init__(self, url, timeout=10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body):
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+        })
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise ConnectionError(f"Upload rejected: HTTP {response.status}")
+
+    async def send(self, body):
+        await asyncio.to_thread(self._post, body)
+
+
+class StoreAndForward:
+    """
+    Sits between the drivers and an export sink: every poll is queued on
+    disk first, a background task drains the queue in compressed batches.
+    During an outage the queue just grows (bounded); after reconnect the
+    backlog is sent oldest first, limited to max_bytes_per_s so the link
+    is not flooded.
+    """
+    def __init__(self, sink, queue, batch_size=BATCH_SIZE, max_bytes_per_s=MAX_BYTES_PER_S):
+        self.sink = sink
+        self.queue = queue
+        self.batch_size = batch_size
+        self.max_bytes_per_s = max_bytes_per_s
+        self.online = True
+        self._task = None
+
+    @classmethod
+    def from_config(cls, cfg):
+        queue = DurableQueue(
+            cfg.get('queue_path', QUEUE_PATH),
+            cfg.get('max_rows', MAX_ROWS),
+            cfg.get('policy', DROP_OLDEST),
+        )
+        return cls(
+            HttpSink(cfg['url']),
+            queue,
+            cfg.get('batch_size', BATCH_SIZE),
+            cfg.get('max_bytes_per_s', MAX_BYTES_PER_S),
+        )
+
+    def put(self, ts, device, readouts):
+        self.queue.put(ts, device, readouts)
+
+    def put_points(self, device, points):
+        """points: [(ts, tag, value), ...] e.g. from compression.TagCompressor"""
+        self.queue.put_rows([(ts, device, tag, value) for ts, tag, value in points])
+
+    def start(self):
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.queue.close()
+
+    async def _drain(self):
+        while True:
+            rows = self.queue.peek(self.batch_size)
+            if not rows:
+                await asyncio.sleep(1.0)
+                continue
+            body = encode_batch(rows)
+            start = time.monotonic()
+            try:
+                await self.sink.send(body)
+            except Exception as e:
+                if self.online:
+                    logging.warning(f"Upstream unreachable, buffering ({self.queue.count} rows queued): {e}")
+                self.online = False
+                await asyncio.sleep(RETRY_DELAY_S)
+                continue
+            if not self.online:
+                logging.info(f"Upstream back, draining {self.queue.count} rows")
+            self.online = True
+            self.queue.ack(rows)
+            # Rate limit: spend at least len(body)/max_bytes_per_s per batch
+            budget = len(body) / self.max_bytes_per_s if self.max_bytes_per_s else 0.0
+            await asyncio.sleep(max(0.0, budget - (time.monotonic() - start)))
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from compression import SwingingDoorFilter
+
+
+def compress(samples, deviation):
+    f = SwingingDoorFilter(deviation)
+    stored = []
+    for t, v in samples:
+        stored += f.offer(t, v)
+    if f.pending():
+        stored.append(f.pending())
+    return stored
+
+
+def max_reconstruction_error(samples, stored):
+    """Largest distance between a sample and the line through the stored points."""
+    error = 0.0
+    for t, v in samples:
+        for (t0, v0), (t1, v1) in zip(stored, stored[1:]):
+            if t0 <= t <= t1:
+                interpolated = v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+                error = max(error, abs(v - interpolated))
+                break
+    return error
+
+
+def test_closing_doors_keep_the_held_point_inside():
+    samples = [(0, 0.0), (1, 0.3), (2, 0.1), (3, 0.5)]
+    stored = compress(samples, 0.2)
+    assert max_reconstruction_error(samples, stored) <= 0.2 + 1e-9
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_noisy_trace_stays_within_deviation(seed):
+    rng = random.Random(seed)
+    value = 50.0
+    samples = []
+    for t in range(2000):
+        value += rng.gauss(0, 0.3)
+        samples.append((float(t), value))
+
+    stored = compress(samples, 0.2)
+    assert len(stored) < len(samples)
+    assert max_reconstruction_error(samples, stored) <= 0.2 + 1e-9
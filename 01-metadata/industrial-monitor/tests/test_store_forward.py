@@ -0,0 +1,32 @@
+from store_forward import DurableQueue
+
+
+def rows(start, n):
+    return [(float(t), "dev", "tag", float(t)) for t in range(start, start + n)]
+
+
+def on_disk(queue):
+    return queue.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+def test_ack_after_overflow_keeps_the_bound(tmp_path):
+    queue = DurableQueue(str(tmp_path / "outbox.sqlite"), max_rows=5)
+    queue.put_rows(rows(0, 5))
+
+    batch = queue.peek(3)          # Upload in flight ...
+    queue.put_rows(rows(5, 3))     # ... while drop_oldest deletes the same rows
+    queue.ack(batch)
+    queue.put_rows(rows(8, 3))
+
+    assert queue.count == on_disk(queue) == 5
+    queue.close()
+
+
+def test_oversized_batch_keeps_newest_rows(tmp_path):
+    queue = DurableQueue(str(tmp_path / "outbox.sqlite"), max_rows=5)
+    queue.put_rows(rows(0, 3))
+    queue.put_rows(rows(10, 10))
+
+    assert queue.count == on_disk(queue) == 5
+    assert [row[1] for row in queue.peek()] == [15.0, 16.0, 17.0, 18.0, 19.0]
+    queue.close()
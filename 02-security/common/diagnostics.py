@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# --- CONFIGURATION (opt-in via environment) ---
+DIAGNOSTICS_ENABLED = os.environ.get("FAN_DIAGNOSTICS", "0") == "1"
+DIAGNOSTICS_HOST = os.environ.get("FAN_DIAGNOSTICS_HOST", "127.0.0.1")
+DIAGNOSTICS_PORT = int(os.environ.get("FAN_DIAGNOSTICS_PORT", "8080"))
+PROFILER_ENABLED = os.environ.get("FAN_PROFILER", "0") == "1"
+
+RATE_WINDOW_S = 10  # Sliding window for requests per second
+
+
+class Diagnostics:
+    """
+    Low overhead runtime counters for the control loop and server callbacks.
+    All updates are plain attribute writes, so they are cheap enough to stay
+    inside the hot path of the loop and of every Read/Write request.
+    """
+    def __init__(self, loop_period=1.0):
+        self.loop_period = loop_period
+        self.loop_count = 0
+        self.overrun_count = 0
+        self.last_loop_time = 0.0   # Work time of the last iteration [s]
+        self.max_loop_time = 0.0
+        self.last_period = 0.0      # Time between two iteration starts [s]
+        self._last_loop_start = None
+
+        self.callback_calls = Counter()
+        self.callback_time = Counter()   # Accumulated seconds per callback
+        self.callback_max = Counter()
+
+        self.active_sessions = None  # Set by servers that track their sessions
+        self.request_count = 0
+        # One bucket per second: [second, count]
+        self._rate_buckets = deque(maxlen=RATE_WINDOW_S)
+
+    # --- Control loop ---
+    def loop_started(self):
+        now = time.perf_counter()
+        if self._last_loop_start is not None:
+            self.last_period = now - self._last_loop_start
+        self._last_loop_start = now
+
+    def loop_finished(self):
+        elapsed = time.perf_counter() - self._last_loop_start
+        self.loop_count += 1
+        self.last_loop_time = elapsed
+        if elapsed > self.max_loop_time:
+            self.max_loop_time = elapsed
+        if elapsed > self.loop_period:
+            self.overrun_count += 1
+
+    # --- Requests & callbacks ---
+    def count_request(self):
+        self.request_count += 1
+        second = int(time.monotonic())
+        if self._rate_buckets and self._rate_buckets[-1][0] == second:
+            self._rate_buckets[-1][1] += 1
+        else:
+            self._rate_buckets.append([second, 1])
+
+    def requests_per_second(self):
+        now = int(time.monotonic())
+        total = sum(count for second, count in self._rate_buckets if now - second < RATE_WINDOW_S)
+        return total / RATE_WINDOW_S
+
+    def record_callback(self, name, elapsed):
+        self.callback_calls[name] += 1
+        self.callback_time[name] += elapsed
+        if elapsed > self.callback_max[name]:
+            self.callback_max[name] = elapsed
+
+    def timed(self, name, callback, counted=None):
+        """
+        Wraps an async server callback so every call is counted as a request
+        and its execution time is accounted to `name`. With `counted`, only
+        events for which counted(event) is true are accounted (e.g. to leave
+        out the server's own internal requests).
+        """
+        async def wrapper(event, dispatcher):
+            if counted is not None and not counted(event):
+                return await callback(event, dispatcher)
+            start = time.perf_counter()
+            try:
+                return await callback(event, dispatcher)
+            finally:
+                self.record_callback(name, time.perf_counter() - start)
+                self.count_request()
+        wrapper.__name__ = callback.__name__
+        return wrapper
+
+    def callback_share(self):
+        """Fraction of the loop budget spent inside server callbacks (0.0 - 1.0)."""
+        if not self.loop_count:
+            return 0.0
+        return sum(self.callback_time.values()) / (self.loop_count * self.loop_period)
+
+    def snapshot(self):
+        stats = {
+            "loop_period_s": self.last_period,
+            "loop_time_s": self.last_loop_time,
+            "loop_time_max_s": self.max_loop_time,
+            "loop_count": self.loop_count,
+            "loop_overruns": self.overrun_count,
+            "requests_total": self.request_count,
+            "requests_per_second": self.requests_per_second(),
+            "callback_budget_share": self.callback_share(),
+            "callbacks": {
+                name: {
+                    "calls": self.callback_calls[name],
+                    "total_s": self.callback_time[name],
+                    "max_s": self.callback_max[name],
+                }
+                for name in self.callback_calls
+            },
+        }
+        if self.active_sessions is not None:
+            stats["active_sessions"] = self.active_sessions
+        return stats
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a daemon thread periodically samples the stack of
+    the target thread instead of tracing every call like cProfile does.
+    """
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.samples = Counter()
+        self.sample_count = 0
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logging.info("Sampling profiler started.")
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logging.info("Sampling profiler stopped.")
+
+    def reset(self):
+        self.samples.clear()
+        self.sample_count = 0
+
+    def _run(self):
+        while self._running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[f"{code.co_filename}:{frame.f_lineno} ({code.co_name})"] += 1
+                self.sample_count += 1
+            time.sleep(self.interval)
+
+    def top(self, n=20):
+        return [
+            {"location": location, "samples": count, "share": count / self.sample_count}
+            for location, count in self.samples.most_common(n)
+        ]
+
+
+class DiagnosticsHttpServer:
+    """
+    Minimal local HTTP endpoint (JSON) so the counters can be inspected with
+    curl without an OPC UA or Modbus client:
+        GET /metrics           -> Diagnostics.snapshot()
+        GET /profiler          -> top sampled locations
+        GET /profiler/start    -> start sampling
+        GET /profiler/stop     -> stop sampling
+    """
+    def __init__(self, diagnostics, profiler=None, host=DIAGNOSTICS_HOST, port=DIAGNOSTICS_PORT):
+        self.diagnostics = diagnostics
+        self.profiler = profiler or SamplingProfiler()
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        """A busy port (e.g. both servers on one host) only disables the endpoint."""
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            logging.error(f"Diagnostics endpoint disabled, cannot listen on {self.host}:{self.port} "
+                          f"(set FAN_DIAGNOSTICS_PORT): {e}")
+            return
+        logging.info(f"Diagnostics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.profiler.running:
+            self.profiler.stop()
+
+    def _route(self, path):
+        if path == "/metrics":
+            return 200, self.diagnostics.snapshot()
+        if path == "/profiler":
+            return 200, {"running": self.profiler.running, "top": self.profiler.top()}
+        if path == "/profiler/start":
+            self.profiler.reset()
+            self.profiler.start()
+            return 200, {"running": True}
+        if path == "/profiler/stop":
+            self.profiler.stop()
+            return 200, {"running": False, "top": self.profiler.top()}
+        return 404, {"error": f"Unknown path {path}"}
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Drain the headers, we do not need them
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) >= 2 else "/"
+            status, payload = self._route(path)
+            body = json.dumps(payload, indent=2).encode()
+            reason = "OK" if status == 200 else "Not Found"
+            writer.write(
+                f"HTTP/1.0 {status} {reason}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logging.warning(f"Diagnostics request failed: {e}")
+        finally:
+            writer.close()
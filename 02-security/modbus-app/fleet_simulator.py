@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import os
+import sys
+
+import numpy as np
+from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext
+from pymodbus.datastore import ModbusSparseDataBlock
+from pymodbus.server import ModbusTcpServer
+
+# diagnostics.py is shared by both 02-security apps (../common)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from diagnostics import DiagnosticsHttpServer, SamplingProfiler, PROFILER_ENABLED
+from modbus_interface import (
+    ValidatingDataBlock, diag, LOOP_PERIOD,
+    REG_CPU_TEMP, REG_THR_HIGH, REG_THR_LOW, REG_TEMP_STATUS, REG_FAN_STATUS, REG_MANUAL_FAN,
+)
+
+REGISTER_COUNT = 100
+MAX_UNIT_ID = 247
+
+
+class RegisterImageBlock(ModbusSparseDataBlock):
+    """
+    Holding registers of one simulated device, stored as one row of the
+    shared NumPy register image instead of a dict.
+    """
+    def __init__(self, row):
+        super().__init__({0: 0})
+        self.row = row
+
+    def validate(self, address, count=1):
+        return 0 <= address and address + count <= len(self.row)
+
+    def getValues(self, address, count=1):
+        return self.row[address:address + count].tolist()
+
+    def setValues(self, address, values):
+        self.row[address:address + len(values)] = values
+
+
+class SimulatedDataBlock(ValidatingDataBlock, RegisterImageBlock):
+    """
+    Same client-side validation as the real device (ValidatingDataBlock),
+    the values live in the register image (RegisterImageBlock).
+    """
+
+
+class FleetSimulator:
+    """
+    Emulates ports x units fan controllers in one process. Every device has
+    its own SimulatedDataBlock, all of them are rows of ONE uint16 array, so
+    the fan logic of the whole fleet is a handful of NumPy column operations
+    per tick instead of one coroutine per device.
+    """
+    def __init__(self, ports, units, base_port=5020, host="0.0.0.0", seed=None):
+        self.host = host
+        self.ports = [base_port + i for i in range(ports)]
+        self.units = units
+        self.image = np.zeros((ports * units, REGISTER_COUNT), dtype=np.uint16)
+        self.image[:, REG_THR_HIGH] = 550
+        self.image[:, REG_THR_LOW] = 450
+        self.rng = np.random.default_rng(seed)
+        self.servers = []
+
+    def context_for_port(self, port_index):
+        devices = {}
+        for unit in range(1, self.units + 1):
+            row = self.image[port_index * self.units + unit - 1]
+            devices[unit] = ModbusDeviceContext(hr=SimulatedDataBlock(row))
+        return ModbusServerContext(devices=devices, single=False)
+
+    def update(self):
+        """One control loop tick for all devices at once."""
+        image = self.image
+        cpu_temp = self.rng.integers(400, 701, size=len(image), dtype=np.uint16)
+        image[:, REG_CPU_TEMP] = cpu_temp
+
+        # Hysteresis Logic
+        status = image[:, REG_TEMP_STATUS]
+        status = np.where(cpu_temp >= image[:, REG_THR_HIGH], 1,
+                          np.where(cpu_temp <= image[:, REG_THR_LOW], 0, status))
+        image[:, REG_TEMP_STATUS] = status
+
+        # Logic Control
+        image[:, REG_FAN_STATUS] = (image[:, REG_MANUAL_FAN] == 1) | (status == 1)
+
+    async def run_logic(self):
+        while True:
+            if diag:
+                diag.loop_started()
+            try:
+                self.update()
+            except Exception as e:
+                print(f"Logic Error: {e}")
+            if diag:
+                diag.loop_finished()
+            await asyncio.sleep(LOOP_PERIOD)
+
+    async def serve(self):
+        for i, port in enumerate(self.ports):
+            self.servers.append(ModbusTcpServer(self.context_for_port(i), address=(self.host, port)))
+        print(f"Simulating {len(self.image)} devices: ports {self.ports[0]}-{self.ports[-1]}, "
+              f"unit IDs 1-{self.units}")
+        await asyncio.gather(self.run_logic(), *(server.serve_forever() for server in self.servers))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Simulate many fan controllers in one process.")
+    parser.add_argument("--ports", type=int, default=1, help="Number of listening ports")
+    parser.add_argument("--units", type=int, default=10, help=f"Unit IDs per port (1..{MAX_UNIT_ID})")
+    parser.add_argument("--base-port", type=int, default=5020)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible CPU temperatures")
+    args = parser.parse_args()
+    if not 1 <= args.units <= MAX_UNIT_ID:
+        parser.error(f"--units must be within 1..{MAX_UNIT_ID}")
+
+    diag_http = None
+    if diag:
+        profiler = SamplingProfiler()
+        if PROFILER_ENABLED:
+            profiler.start()
+        diag_http = DiagnosticsHttpServer(diag, profiler)
+        await diag_http.start()
+
+    try:
+        await FleetSimulator(args.ports, args.units, args.base_port, args.host, args.seed).serve()
+    finally:
+        if diag_http:
+            await diag_http.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nShutting down...")
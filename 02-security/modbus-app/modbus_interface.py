@@ -2,6 +2,8 @@ import asyncio
 import random
 import os
 import platform  # Useful for detecting the OS
+import sys
+import time
 
 from pymodbus.server import StartAsyncTcpServer as modbus_server 
 from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext
@@ -9,6 +11,13 @@ from pymodbus.datastore import ModbusSparseDataBlock
 from pymodbus.pdu import ExceptionResponse
 from pymodbus.constants import ExcCodes
 
+# diagnostics.py is shared by both 02-security apps (../common)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from diagnostics import (
+    Diagnostics, DiagnosticsHttpServer, SamplingProfiler,
+    DIAGNOSTICS_ENABLED, PROFILER_ENABLED,
+)
+
 # --- CONDITIONAL GPIO IMPORT ---
 try:
     import RPi.GPIO as GPIO
@@ -43,12 +52,49 @@ REG_TEMP_STATUS = 33 + 1  # Read-Only for Client
 REG_FAN_STATUS  = 34 + 1  # Read-Only for Client
 REG_MANUAL_FAN  = 35 + 1  # R/W - (0 or 1)
 
+LOOP_PERIOD = 1.0  # s
+
+# --- DIAGNOSTICS (Input Registers, only with FAN_DIAGNOSTICS=1) ---
+IR_DIAG_LOOP_PERIOD   = 90 + 1  # ms between two loop iterations
+IR_DIAG_LOOP_TIME     = 91 + 1  # ms work time of last iteration
+IR_DIAG_LOOP_TIME_MAX = 92 + 1  # ms longest iteration since start
+IR_DIAG_LOOP_OVERRUNS = 93 + 1  # Count (wraps at 65535)
+IR_DIAG_VALIDATE_US   = 94 + 1  # us max time spent in ValidatingDataBlock.setValues
+IR_DIAG_CB_SHARE      = 95 + 1  # Callback share of loop budget x 1000
+IR_DIAG_REQ_RATE      = 96 + 1  # Requests per second x 10
+
+diag = Diagnostics(loop_period=LOOP_PERIOD) if DIAGNOSTICS_ENABLED else None
+
 # --- CUSTOM VALIDATION LOGIC ---
 class ValidatingDataBlock(ModbusSparseDataBlock):
+    def getValues(self, address, count=1):
+        """
+        EXTERNAL Modbus network reads (counted for diagnostics).
+        """
+        if diag:
+            diag.count_request()
+        return super().getValues(address, count)
+
+    def get_internal(self, address, count=1):
+        """
+        Bypass method for the server's internal logic loop.
+        """
+        return super().getValues(address, count)
+
     def setValues(self, address, values):
         """
         Intercepts EXTERNAL Modbus network writes.
         """
+        if not diag:
+            return self._validate_and_set(address, values)
+        start = time.perf_counter()
+        try:
+            return self._validate_and_set(address, values)
+        finally:
+            diag.record_callback("validate_write", time.perf_counter() - start)
+            diag.count_request()
+
+    def _validate_and_set(self, address, values):
         for i, val in enumerate(values):
             current_addr = address + i
 
@@ -79,6 +125,17 @@ class ValidatingDataBlock(ModbusSparseDataBlock):
         """
         return super().setValues(address, values)
 
+    def commit(self, updates):
+        """
+        Publishes all outputs of one logic cycle at once ({address: value}).
+        Client requests and this loop run on the same asyncio event loop
+        and there is no await in here, so no request can be served between
+        the single register updates: a client read sees either the previous
+        or the new cycle, never a mix. Updating in place is therefore atomic
+        and avoids copying the whole image every tick.
+        """
+        self.values.update(updates)
+
 # --- HARDWARE & LOGIC ---
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(FAN_PIN, GPIO.OUT)
@@ -103,42 +160,57 @@ async def run_fan_logic(context):
     hr_block = context[slave_id].store['h']
 
     while True:
+        if diag:
+            diag.loop_started()
         try:
             cpu_temp = get_cpu_temp()
-            
-            # Use set_internal to update Read-Only registers internally
-            hr_block.set_internal(REG_CPU_TEMP, [cpu_temp])
 
-            # Read settings
-            high_thr = hr_block.getValues(REG_THR_HIGH, 1)[0]
-            low_thr = hr_block.getValues(REG_THR_LOW, 1)[0]
-            manual = hr_block.getValues(REG_MANUAL_FAN, 1)[0]
-            status = hr_block.getValues(REG_TEMP_STATUS, 1)[0]
+            # Read settings: ONE read of the consecutive control block (30..35)
+            _, high_thr, low_thr, status, _, manual = hr_block.get_internal(REG_CPU_TEMP, 6)
 
             # Hysteresis Logic
             if cpu_temp >= high_thr:
                 status = 1
             elif cpu_temp <= low_thr:
                 status = 0
-            
-            hr_block.set_internal(REG_TEMP_STATUS, [status])
 
             # Logic Control
-            if manual == 1 or status == 1:
-                GPIO.output(FAN_PIN, GPIO.HIGH)
-                hr_block.set_internal(REG_FAN_STATUS, [1])
-            else:
-                GPIO.output(FAN_PIN, GPIO.LOW)
-                hr_block.set_internal(REG_FAN_STATUS, [0])
-                
+            fan = 1 if manual == 1 or status == 1 else 0
+            GPIO.output(FAN_PIN, GPIO.HIGH if fan else GPIO.LOW)
+
+            # Commit all Read-Only registers in one step
+            hr_block.commit({
+                REG_CPU_TEMP: cpu_temp,
+                REG_TEMP_STATUS: status,
+                REG_FAN_STATUS: fan,
+            })
         except Exception as e:
             print(f"Logic Error: {e}")
-        await asyncio.sleep(1)
+        if diag:
+            diag.loop_finished()
+            publish_diagnostics(context[slave_id].store['i'])
+        await asyncio.sleep(LOOP_PERIOD)
+
+def publish_diagnostics(ir_block):
+    """
+    Mirrors the diagnostics counters into the spare input registers.
+    """
+    validate_max = diag.callback_max.get("validate_write", 0.0)
+    ir_block.setValues(IR_DIAG_LOOP_PERIOD, [
+        min(int(diag.last_period * 1000), 65535),
+        min(int(diag.last_loop_time * 1000), 65535),
+        min(int(diag.max_loop_time * 1000), 65535),
+        diag.overrun_count % 65536,
+        min(int(validate_max * 1_000_000), 65535),
+        min(int(diag.callback_share() * 1000), 65535),
+        min(int(diag.requests_per_second() * 10), 65535),
+    ])
 
 async def main():
     # Initialize block from address 0 to ensure mapping matches constants
     block = ValidatingDataBlock({addr: 0 for addr in range(0, 100)})
-    store = ModbusDeviceContext(hr=block)
+    diag_block = ModbusSparseDataBlock({addr: 0 for addr in range(0, 100)})
+    store = ModbusDeviceContext(hr=block, ir=diag_block)
     context = ModbusServerContext(store, single=True)
 
     # Initialize defaults via the internal bypass
@@ -147,11 +219,23 @@ async def main():
 
     asyncio.create_task(run_fan_logic(context))
 
+    diag_http = None
+    if diag:
+        profiler = SamplingProfiler()
+        if PROFILER_ENABLED:
+            profiler.start()
+        diag_http = DiagnosticsHttpServer(diag, profiler)
+        await diag_http.start()
+
     print("Starting Modbus Server on 0.0.0.0:5020...")
-    await modbus_server(
-        context=context, 
-        address=("0.0.0.0", 5020)
-    )
+    try:
+        await modbus_server(
+            context=context, 
+            address=("0.0.0.0", 5020)
+        )
+    finally:
+        if diag_http:
+            await diag_http.stop()
 
 if __name__ == "__main__":
     try:
@@ -1,23 +1,100 @@
+import argparse
 import datetime
 import ipaddress
 import os
 import socket
+from concurrent.futures import ProcessPoolExecutor
 from cryptography import x509
 from cryptography.x509.oid import NameOID, ExtendedKeyUsageOID
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
-def generate_self_signed_cert():
+APP_URI = "urn:fan:control:opc-ua:server"
+OUTPUT_DIR = "certs"
+KEY_FILE = "server_key.pem"
+CERT_FILE = "server_cert.der"
+VALID_DAYS = 365
+RENEW_BEFORE_DAYS = 30  # Reuse an existing certificate until it is this close to expiry
+
+# Key types per security policy. Basic256Sha256 mandates RSA (2048-4096 bit),
+# so RSA-2048 stays the default. server.py only offers Basic256Sha256 and
+# refuses other keys, so no ECC policy/key type is offered here.
+KEY_TYPES = {
+    "rsa2048": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "rsa3072": lambda: rsa.generate_private_key(public_exponent=65537, key_size=3072),
+}
+POLICY_KEY_TYPES = {
+    "Basic256Sha256": ["rsa2048", "rsa3072"],
+}
+
+
+def cert_paths(output_dir):
+    return os.path.join(output_dir, KEY_FILE), os.path.join(output_dir, CERT_FILE)
+
+
+def _not_valid_after(cert):
+    # cryptography >= 42 offers the timezone aware variant
+    if hasattr(cert, "not_valid_after_utc"):
+        return cert.not_valid_after_utc
+    return cert.not_valid_after.replace(tzinfo=datetime.UTC)
+
+
+def key_type_of(public_key):
+    """Name of the public key's type in KEY_TYPES (None if it is none of them)."""
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return f"rsa{public_key.key_size}"
+    return None
+
+
+def existing_cert_is_valid(output_dir, hostname, key_type="rsa2048", renew_before_days=RENEW_BEFORE_DAYS):
+    """
+    True if key and certificate exist, belong together, are of `key_type`,
+    cover `hostname` and are not about to expire - in that case nothing has
+    to be generated.
+    """
+    key_path, cert_path = cert_paths(output_dir)
+    try:
+        with open(cert_path, "rb") as f:
+            cert = x509.load_der_x509_certificate(f.read())
+        with open(key_path, "rb") as f:
+            key = serialization.load_pem_private_key(f.read(), password=None)
+    except (FileNotFoundError, ValueError):
+        return False
+
+    remaining = _not_valid_after(cert) - datetime.datetime.now(datetime.UTC)
+    if remaining < datetime.timedelta(days=renew_before_days):
+        return False
+
+    public_format = serialization.PublicFormat.SubjectPublicKeyInfo
+    if cert.public_key().public_bytes(serialization.Encoding.DER, public_format) != \
+            key.public_key().public_bytes(serialization.Encoding.DER, public_format):
+        return False
+
+    # e.g. an RSA certificate when an EC key was requested
+    if key_type_of(cert.public_key()) != key_type:
+        return False
+
+    try:
+        san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+    except x509.ExtensionNotFound:
+        return False
+    return hostname in san.get_values_for_type(x509.DNSName)
+
+
+def generate_self_signed_cert(hostname=None, output_dir=OUTPUT_DIR, key_type="rsa2048",
+                              force=False, renew_before_days=RENEW_BEFORE_DAYS):
     # 1. Get the local hostname dynamically
-    hostname = socket.gethostname()
-    
-    # 2. Setup the output directory
-    output_dir = "certs"
+    hostname = hostname or socket.gethostname()
+
+    # 2. Reuse the existing material while it is still valid
+    if not force and existing_cert_is_valid(output_dir, hostname, key_type, renew_before_days):
+        return hostname, False
+
+    # 3. Setup the output directory
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-    app_uri = "urn:fan:control:opc-ua:server"
+    key = KEY_TYPES[key_type]()
 
     subject = issuer = x509.Name([
         x509.NameAttribute(NameOID.COUNTRY_NAME, "US"),
@@ -25,6 +102,7 @@ def generate_self_signed_cert():
         x509.NameAttribute(NameOID.COMMON_NAME, hostname), # Also updated Common Name
     ])
 
+    is_rsa = isinstance(key, rsa.RSAPrivateKey)
     cert = (
         x509.CertificateBuilder()
         .subject_name(subject)
@@ -32,14 +110,14 @@ def generate_self_signed_cert():
         .public_key(key.public_key())
         .serial_number(x509.random_serial_number())
         .not_valid_before(datetime.datetime.now(datetime.UTC))
-        .not_valid_after(datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=365))
+        .not_valid_after(datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=VALID_DAYS))
         .add_extension(
             x509.KeyUsage(
                 digital_signature=True,
                 content_commitment=True,
-                key_encipherment=True,
-                data_encipherment=True,
-                key_agreement=False,
+                key_encipherment=is_rsa,
+                data_encipherment=is_rsa,
+                key_agreement=not is_rsa,
                 key_cert_sign=False,
                 crl_sign=False,
                 encipher_only=False,
@@ -59,29 +137,79 @@ def generate_self_signed_cert():
                 x509.DNSName("localhost"),
                 x509.DNSName(hostname), # <--- Dynamically sets the device name
                 x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
-                x509.UniformResourceIdentifier(app_uri),
+                x509.UniformResourceIdentifier(APP_URI),
             ]),
             critical=False,
         )
         .sign(key, hashes.SHA256())
     )
 
-    # 3. Save files into the 'certs/' folder
-    key_path = os.path.join(output_dir, "server_key.pem")
-    cert_path = os.path.join(output_dir, "server_cert.der")
+    # 4. Save files into the output folder. Write to temp files and rename so
+    # a running server watching the files never sees a half written pair.
+    key_path, cert_path = cert_paths(output_dir)
+    key_format = serialization.PrivateFormat.TraditionalOpenSSL if is_rsa else serialization.PrivateFormat.PKCS8
 
-    with open(key_path, "wb") as f:
+    with open(key_path + ".tmp", "wb") as f:
         f.write(key.private_bytes(
             encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            format=key_format,
             encryption_algorithm=serialization.NoEncryption(),
         ))
-
-    with open(cert_path, "wb") as f:
+    with open(cert_path + ".tmp", "wb") as f:
         f.write(cert.public_bytes(serialization.Encoding.DER))
+    os.replace(key_path + ".tmp", key_path)
+    os.replace(cert_path + ".tmp", cert_path)
+
+    return hostname, True
+
+
+def generate_batch(hostnames, output_root=OUTPUT_DIR, key_type="rsa2048", force=False,
+                   renew_before_days=RENEW_BEFORE_DAYS, workers=None):
+    """
+    Provisions certificates for many devices in parallel, one folder per
+    device (certs/<hostname>/). Key generation is CPU bound, so a process
+    pool scales it over all cores.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(generate_self_signed_cert, hostname, os.path.join(output_root, hostname),
+                        key_type, force, renew_before_days)
+            for hostname in hostnames
+        ]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create (or reuse) the OPC UA server certificates.")
+    parser.add_argument("--hosts", nargs="*", help="Batch mode: generate certs/<host>/ for every host")
+    parser.add_argument("--hosts-file", help="Batch mode: file with one hostname per line")
+    parser.add_argument("--key-type", choices=KEY_TYPES.keys(), default="rsa2048")
+    parser.add_argument("--policy", choices=POLICY_KEY_TYPES.keys(), default="Basic256Sha256",
+                        help="Security policy the key has to be usable with")
+    parser.add_argument("--renew-days", type=int, default=RENEW_BEFORE_DAYS,
+                        help="Regenerate certificates expiring within this many days")
+    parser.add_argument("--force", action="store_true", help="Always generate new key material")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for batch mode (default: all cores)")
+    args = parser.parse_args()
+
+    if args.key_type not in POLICY_KEY_TYPES[args.policy]:
+        parser.error(f"Key type {args.key_type} is not allowed by {args.policy} "
+                     f"(use one of {', '.join(POLICY_KEY_TYPES[args.policy])})")
+
+    hostnames = list(args.hosts or [])
+    if args.hosts_file:
+        with open(args.hosts_file) as f:
+            hostnames += [line.strip() for line in f if line.strip()]
+
+    if hostnames:
+        results = generate_batch(hostnames, OUTPUT_DIR, args.key_type, args.force,
+                                 args.renew_days, args.workers)
+    else:
+        results = [generate_self_signed_cert(None, OUTPUT_DIR, args.key_type, args.force, args.renew_days)]
 
-    print(f"Certificates generated for: {hostname}")
-    print(f"Files saved in: {output_dir}/")
+    for hostname, generated in results:
+        print(f"Certificates {'generated' if generated else 'reused (still valid)'} for: {hostname}")
+    print(f"Files saved in: {OUTPUT_DIR}/")
 
 if __name__ == "__main__":
-    generate_self_signed_cert()
\ No newline at end of file
+    main()
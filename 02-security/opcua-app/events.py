@@ -0,0 +1,95 @@
+import logging
+from asyncua import ua
+
+# Severity 1 (low) .. 1000 (high) as defined by OPC UA Part 5
+SEVERITY_OVERHEAT = 800
+SEVERITY_WRITE_REJECTED = 500
+SEVERITY_CLEARED = 300
+SEVERITY_SETPOINT = 200
+
+
+class FanEvents:
+    """
+    Server side events of the fan controller. Clients subscribe ONCE to the
+    Server object and get notified of overheat alarms and setpoint changes,
+    instead of polling the status variables.
+
+    Custom subtypes of BaseEventType are used (asyncua has no condition
+    refresh/acknowledge state machine for AlarmConditionType); `Active`
+    plus Severity carry the alarm state. SourceNode is the FanControl object.
+    """
+    def __init__(self, server, source):
+        self.server = server
+        self.source = source
+        self.generators = {}
+
+    async def setup(self, ns):
+        overheat_type = await self.server.create_custom_event_type(
+            ns, "OverheatAlarmEventType", ua.ObjectIds.BaseEventType,
+            [
+                ("Active", ua.VariantType.Boolean),
+                ("Temperature", ua.VariantType.Double),
+                ("HighThreshold", ua.VariantType.Double),
+            ],
+        )
+        setpoint_type = await self.server.create_custom_event_type(
+            ns, "SetpointChangedEventType", ua.ObjectIds.BaseEventType,
+            [
+                ("Setpoint", ua.VariantType.String),
+                ("OldValue", ua.VariantType.Double),
+                ("NewValue", ua.VariantType.Double),
+            ],
+        )
+        rejected_type = await self.server.create_custom_event_type(
+            ns, "WriteRejectedEventType", ua.ObjectIds.BaseEventType,
+            [
+                ("Setpoint", ua.VariantType.String),
+                ("RejectedValue", ua.VariantType.Double),
+                ("Reason", ua.VariantType.String),
+            ],
+        )
+        for name, etype in [
+            ("overheat", overheat_type),
+            ("setpoint", setpoint_type),
+            ("rejected", rejected_type),
+        ]:
+            # Emitted by the Server object, so one subscription covers everything
+            gen = await self.server.get_event_generator(etype, ua.ObjectIds.Server)
+            gen.event.SourceNode = self.source.nodeid
+            gen.event.SourceName = "FanControl"
+            self.generators[name] = gen
+
+    async def _trigger(self, name, severity, message, **fields):
+        gen = self.generators[name]
+        gen.event.Severity = severity
+        for field, value in fields.items():
+            setattr(gen.event, field, value)
+        try:
+            await gen.trigger(message=message)
+        except Exception as e:
+            logging.warning(f"Could not emit {name} event: {e}")
+
+    async def overheat(self, active, temperature, high_threshold):
+        if active:
+            message = f"Overheat: CPU {temperature:.1f}°C >= {high_threshold:.1f}°C"
+        else:
+            message = f"Overheat cleared: CPU {temperature:.1f}°C"
+        await self._trigger(
+            "overheat", SEVERITY_OVERHEAT if active else SEVERITY_CLEARED, message,
+            Active=active, Temperature=float(temperature), HighThreshold=float(high_threshold),
+        )
+
+    async def setpoint_changed(self, setpoint, old_value, new_value):
+        await self._trigger(
+            "setpoint", SEVERITY_SETPOINT, f"{setpoint} changed: {old_value} -> {new_value}",
+            Setpoint=setpoint, OldValue=float(old_value), NewValue=float(new_value),
+        )
+
+    async def write_rejected(self, write_value, status):
+        setpoint = str(write_value.NodeId.Identifier)
+        value = write_value.Value.Value.Value
+        reason = status.name if hasattr(status, "name") else str(status)
+        await self._trigger(
+            "rejected", SEVERITY_WRITE_REJECTED, f"Rejected write to {setpoint}: {value} ({reason})",
+            Setpoint=setpoint, RejectedValue=float(value), Reason=reason,
+        )
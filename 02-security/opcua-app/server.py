@@ -1,33 +1,98 @@
 import asyncio
 import logging
+import os
+import sys
 from asyncua import ua, Server
 from hardware import PiHardware
+from validation import WriteValidator
+from setpoints import SetpointStore, write_initial_values
+from events import FanEvents
 from user_manager import FanUserManager, Ruleset, change_user_access_level
 from asyncua.common.callback import CallbackType
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+# diagnostics.py is shared by both 02-security apps (../common)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from diagnostics import (
+    Diagnostics, DiagnosticsHttpServer, SamplingProfiler,
+    DIAGNOSTICS_ENABLED, PROFILER_ENABLED,
+)
 
 logging.basicConfig(level=logging.INFO)
 
 LIMIT_HIGH_THRESHOLD = 65.0  # °C
 LIMIT_LOW_THRESHOLD = 55.0   # °C
+LOOP_PERIOD = 1.0            # s
 
-async def validate_thresholds(event, dispatcher):
-    # event.user is the user object from your UserManager
-    # event.request_params contains the WriteValue objects
-    for write_value in event.request_params.NodesToWrite:
-        node_id = write_value.NodeId
-        new_val = write_value.Value.Value.Value  # Extract the actual python value
-
-        # Check HighThreshold (e.g., must be between 0.0 and 60.0)
-        if "HighThreshold" in str(node_id):
-            if not (0.0 <= new_val <= LIMIT_HIGH_THRESHOLD):
-                logging.warning(f"Rejected HighThreshold write: {new_val}")
-                raise ua.UaStatusCodeError(ua.StatusCodes.BadOutOfRange)
-
-        # Check LowThreshold (e.g., must be between 0.0 and 50.0)
-        elif "LowThreshold" in str(node_id):
-            if not (0.0 <= new_val <= LIMIT_LOW_THRESHOLD):
-                logging.warning(f"Rejected LowThreshold write: {new_val}")
-                raise ua.UaStatusCodeError(ua.StatusCodes.BadOutOfRange)
+CERT_PATH = "certs/server_cert.der"
+KEY_PATH = "certs/server_key.pem"
+CERT_CHECK_INTERVAL = 60     # s, how often the cert files are checked for rotation
+
+async def publish_diagnostics(server, diag, diag_nodes):
+    # BinaryServer keeps one protocol instance per connected client
+    diag.active_sessions = len(getattr(server.bserver, "clients", []))
+    stats = diag.snapshot()
+    callbacks = stats["callbacks"]
+    values = {
+        "LoopPeriod": stats["loop_period_s"],
+        "LoopTime": stats["loop_time_s"],
+        "LoopTimeMax": stats["loop_time_max_s"],
+        "LoopOverruns": stats["loop_overruns"],
+        "CallbackBudgetShare": stats["callback_budget_share"],
+        "ValidateThresholdsTime": callbacks.get("validate_thresholds", {}).get("total_s", 0.0),
+        "ChangeUserAccessLevelTime": callbacks.get("change_user_access_level", {}).get("total_s", 0.0),
+        "ActiveSessions": stats["active_sessions"],
+        "RequestsPerSecond": stats["requests_per_second"],
+    }
+    for name, value in values.items():
+        await diag_nodes[name].write_value(value)
+
+def setpoint_variant(name, value):
+    if name == "ManualOverride":
+        return ua.Variant(bool(value), ua.VariantType.Boolean)
+    return ua.Variant(float(value), ua.VariantType.Double)
+
+def check_rsa_key(key_path=KEY_PATH):
+    """
+    The Basic256Sha256 policies only work with RSA keys; anything else in
+    certs/ would break every new secure channel, so it is refused.
+    """
+    with open(key_path, "rb") as f:
+        key = serialization.load_pem_private_key(f.read(), password=None)
+    if not isinstance(key, rsa.RSAPrivateKey):
+        raise ValueError(f"{key_path} is not an RSA key, Basic256Sha256 needs RSA")
+
+async def reload_certificate(server):
+    """
+    Hot-reloads a rotated certificate/key pair (e.g. written by create_certs.py).
+    Endpoints and security policies are rebuilt for NEW secure channels;
+    already open channels keep their policy objects, so sessions survive.
+    """
+    check_rsa_key(KEY_PATH)
+    await server.load_certificate(CERT_PATH)
+    await server.load_private_key(KEY_PATH)
+    # asyncua only builds endpoints/policies at start, so redo that step
+    server.iserver.endpoints = []
+    server._policies = []
+    await server._setup_server_nodes()
+    server.bserver.set_policies(server._policies)
+    logging.info("Rotated server certificate loaded.")
+
+async def watch_certificate(server, interval=CERT_CHECK_INTERVAL):
+    last_mtime = os.path.getmtime(CERT_PATH)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = os.path.getmtime(CERT_PATH)
+        except FileNotFoundError:
+            continue
+        if mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            await reload_certificate(server)
+        except Exception as e:
+            logging.error(f"Certificate reload failed, keeping the old one: {e}")
 
 async def main():
     user_manager = FanUserManager()
@@ -121,16 +186,45 @@ async def main():
     )
     #--------------------------------
 
+    # Diagnostic Nodes (opt-in, FAN_DIAGNOSTICS=1)
+    #--------------------------------
+    diag = Diagnostics(loop_period=LOOP_PERIOD) if DIAGNOSTICS_ENABLED else None
+    diag_nodes = {}
+    if diag:
+        diag_obj = await obj.add_object(ns, "Diagnostics")
+        for name, initial, description in [
+            ("LoopPeriod", 0.0, "Measured time between two control loop iterations [s]"),
+            ("LoopTime", 0.0, "Work time of the last control loop iteration [s]"),
+            ("LoopTimeMax", 0.0, "Longest control loop iteration since start [s]"),
+            ("LoopOverruns", 0, "Number of iterations exceeding the loop period"),
+            ("CallbackBudgetShare", 0.0, "Share of the loop budget spent in security/validation callbacks (0..1)"),
+            ("ValidateThresholdsTime", 0.0, "Accumulated time in threshold write validation [s]"),
+            ("ChangeUserAccessLevelTime", 0.0, "Accumulated time in change_user_access_level [s]"),
+            ("ActiveSessions", 0, "Number of connected clients"),
+            ("RequestsPerSecond", 0.0, "Read/Write requests per second (10 s average)"),
+        ]:
+            node = await diag_obj.add_variable(ns, name, initial)
+            await node.write_attribute(
+                ua.AttributeIds.Description,
+                ua.DataValue(ua.LocalizedText(description))
+            )
+            diag_nodes[name] = node
+    #--------------------------------
+
     server.set_endpoint("opc.tcp://0.0.0.0:4840/pi/fan/")
     server.set_server_name("RPi Fan Control Server")
 
     # Load security (ensure you ran create_certs.py)
     try:
-        await server.load_certificate("certs/server_cert.der")
-        await server.load_private_key("certs/server_key.pem")
+        check_rsa_key(KEY_PATH)
+        await server.load_certificate(CERT_PATH)
+        await server.load_private_key(KEY_PATH)
     except FileNotFoundError:
         logging.error("Missing certs! Run create_certs.py first.")
         return
+    except ValueError as e:
+        logging.error(f"Unusable server key: {e}. Run create_certs.py --force.")
+        return
 
     # Apply tokens
     server.set_identity_tokens(
@@ -151,42 +245,136 @@ async def main():
         Ruleset() 
     )
 
-    server.subscribe_server_callback(CallbackType.PostRead, change_user_access_level)
-    server.subscribe_server_callback(CallbackType.PreWrite, validate_thresholds)
+    if diag:
+        server.subscribe_server_callback(
+            CallbackType.PostRead,
+            diag.timed(
+                "change_user_access_level", change_user_access_level,
+                # The control loop reads through the internal session, only client sessions count
+                counted=lambda event: event.user is not server.iserver.isession.user,
+            ),
+        )
+    else:
+        server.subscribe_server_callback(CallbackType.PostRead, change_user_access_level)
+
+    # Range validation of client writes, built once from the EURange properties
+    validator = await WriteValidator.from_nodes([high_thr, low_thr, manual_ovr], ns)
+    validator.install(server, diag)
+
+    # Events (overheat alarm, setpoint changes, rejected writes) via the Server object
+    events = FanEvents(server, obj)
+    await events.setup(ns)
+    validator.on_reject = events.write_rejected
     
     hw = PiHardware()
+
+    # Restore operator setpoints from the last run (falls back to hardware defaults)
+    setpoints = SetpointStore()
+    hw_defaults = {
+        "LowThreshold": hw.get_low_threshold(),
+        "HighThreshold": hw.get_high_threshold(),
+        "ManualOverride": hw.get_manual_override(),
+    }
+    # Same limits as the EURange of the nodes, so no restored value would be rejected
+    restored = setpoints.load(hw_defaults, limits={
+        "LowThreshold": (0.0, LIMIT_LOW_THRESHOLD),
+        "HighThreshold": (0.0, LIMIT_HIGH_THRESHOLD),
+    })
+    hw.set_low_threshold(restored["LowThreshold"])
+    hw.set_high_threshold(restored["HighThreshold"])
+    hw.set_manual_override(restored["ManualOverride"])
+
     # 4. START SERVER
     async with server:
         logging.info("Server is running...")
-        await low_thr.write_value(hw.get_low_threshold())
-        await high_thr.write_value(hw.get_high_threshold())
-        await manual_ovr.write_value(hw.get_manual_override())
-        # intial write of variables
-        while True:
-            # 1. READ values from the OPC UA Server (in case a client changed them)
-            # This ensures the Hardware object stays in sync with the UA Interface 
-            current_low = await low_thr.read_value()
-            current_high = await high_thr.read_value()
-            current_manual = await manual_ovr.read_value()
-
-            hw.set_low_threshold(current_low)
-            hw.set_high_threshold(current_high)
-            hw.set_manual_override(current_manual)
-
-            # 2. READ actual CPU temperature from hardware
-            act_cpu_temp = hw.get_cpu_temp()
-            await cpu_temp.write_value(act_cpu_temp)
-
-            # 3. RUN the Hysteresis Logic
-            # We call the internal hardware method that checks the thresholds
-            hw.fan_control(act_cpu_temp)
-
-            # 4. UPDATE the Fan Status in OPC UA so clients can see it
-            # Using _fan_state from the hardware class
-            await fan_status.write_value(hw.get_fan_state())            
-            await overheat_status.write_value(hw.get_overheat_state())
-            
-            await asyncio.sleep(1)
+        diag_http = None
+        if diag:
+            profiler = SamplingProfiler()
+            if PROFILER_ENABLED:
+                profiler.start()
+            diag_http = DiagnosticsHttpServer(diag, profiler)
+            await diag_http.start()
+        cert_watcher = asyncio.create_task(watch_certificate(server))
+        # intial write of variables (one bulk Write)
+        setpoint_nodes = {"LowThreshold": low_thr, "HighThreshold": high_thr, "ManualOverride": manual_ovr}
+        results = await write_initial_values(server, [
+            (setpoint_nodes[name], setpoint_variant(name, value)) for name, value in restored.items()
+        ])
+        # A rejected restored value falls back to the hardware default
+        failed = [name for name, status in zip(restored, results) if not status.is_good()]
+        if failed:
+            await write_initial_values(server, [
+                (setpoint_nodes[name], setpoint_variant(name, hw_defaults[name])) for name in failed
+            ])
+            restored.update({name: hw_defaults[name] for name in failed})
+            hw.set_low_threshold(restored["LowThreshold"])
+            hw.set_high_threshold(restored["HighThreshold"])
+            hw.set_manual_override(restored["ManualOverride"])
+        # Last published state, used to emit events on changes only
+        last_overheat = hw.get_overheat_state()
+        last_setpoints = {
+            "LowThreshold": hw.get_low_threshold(),
+            "HighThreshold": hw.get_high_threshold(),
+            "ManualOverride": hw.get_manual_override(),
+        }
+        try:
+            while True:
+                if diag:
+                    diag.loop_started()
+                # 1. READ values from the OPC UA Server (in case a client changed them)
+                # This ensures the Hardware object stays in sync with the UA Interface 
+                current_low = await low_thr.read_value()
+                current_high = await high_thr.read_value()
+                current_manual = await manual_ovr.read_value()
+
+                hw.set_low_threshold(current_low)
+                hw.set_high_threshold(current_high)
+                hw.set_manual_override(current_manual)
+
+                # Persist client changes (debounced, written at most once per FLUSH_DEBOUNCE_S)
+                current_setpoints = {
+                    "LowThreshold": current_low,
+                    "HighThreshold": current_high,
+                    "ManualOverride": current_manual,
+                }
+                setpoints.update(current_setpoints)
+                setpoints.maybe_flush()
+
+                for name, value in current_setpoints.items():
+                    if value != last_setpoints[name]:
+                        await events.setpoint_changed(name, last_setpoints[name], value)
+                last_setpoints = current_setpoints
+
+                # 2. READ actual CPU temperature from hardware
+                act_cpu_temp = hw.get_cpu_temp()
+                await cpu_temp.write_value(act_cpu_temp)
+
+                # 3. RUN the Hysteresis Logic
+                # We call the internal hardware method that checks the thresholds
+                hw.fan_control(act_cpu_temp)
+
+                # 4. UPDATE the Fan Status in OPC UA so clients can see it
+                # Using _fan_state from the hardware class
+                await fan_status.write_value(hw.get_fan_state())            
+                await overheat_status.write_value(hw.get_overheat_state())
+
+                # Raise/clear the overheat alarm on transitions
+                if hw.get_overheat_state() != last_overheat:
+                    last_overheat = hw.get_overheat_state()
+                    await events.overheat(last_overheat, act_cpu_temp, hw.get_high_threshold())
+
+                # 5. PUBLISH diagnostics (values of the previous iteration)
+                if diag:
+                    diag.loop_finished()
+                    await publish_diagnostics(server, diag, diag_nodes)
+                
+                await asyncio.sleep(LOOP_PERIOD)
+        finally:
+            # Do not lose a pending change on shutdown
+            setpoints.flush()
+            cert_watcher.cancel()
+            if diag_http:
+                await diag_http.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
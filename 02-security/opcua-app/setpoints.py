@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import time
+from asyncua import ua
+
+SETPOINT_FILE = "setpoints.json"
+FLUSH_DEBOUNCE_S = 5.0  # Coalesce bursts of client writes into one fsync
+
+
+class SetpointStore:
+    """
+    Persists operator setpoints (thresholds, manual override) in a small JSON
+    file so a restart keeps the values clients have written.
+
+    Changes only mark the store dirty; the file is rewritten atomically
+    (tmp file + fsync + rename) once no further change arrived for
+    FLUSH_DEBOUNCE_S seconds, which keeps SD card writes to a minimum.
+    """
+    def __init__(self, path=SETPOINT_FILE, debounce=FLUSH_DEBOUNCE_S):
+        self.path = path
+        self.debounce = debounce
+        self.values = {}
+        self._dirty = False
+        self._last_change = 0.0
+
+    def load(self, defaults, limits=None):
+        """
+        Returns the stored setpoints merged over `defaults`. A stored value
+        of the wrong type or outside its (low, high) entry in `limits` is
+        rejected and the default is kept for that key.
+        """
+        self.values = dict(defaults)
+        limits = limits or {}
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+            if not isinstance(stored, dict):
+                raise ValueError("expected a JSON object")
+            for key, value in stored.items():
+                if key not in defaults:
+                    continue
+                if _is_valid(value, defaults[key], limits.get(key)):
+                    self.values[key] = value
+                else:
+                    logging.warning(f"Ignoring stored setpoint {key}={value!r}, using default {defaults[key]!r}")
+            logging.info(f"Restored setpoints from {self.path}: {self.values}")
+        except FileNotFoundError:
+            logging.info("No stored setpoints, using defaults.")
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable setpoint file {self.path}: {e}")
+        return dict(self.values)
+
+    def update(self, values):
+        """Records the current setpoints, only changed values mark the store dirty."""
+        for key, value in values.items():
+            if self.values.get(key) != value:
+                self.values[key] = value
+                self._dirty = True
+                self._last_change = time.monotonic()
+
+    def maybe_flush(self):
+        if self._dirty and time.monotonic() - self._last_change >= self.debounce:
+            self.flush()
+
+    def flush(self):
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.values, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logging.error(f"Could not persist setpoints: {e}")
+
+
+def _is_valid(value, default, limit):
+    """Same type as the default (ints are fine for floats) and within limit."""
+    if isinstance(default, bool) or isinstance(value, bool):
+        return isinstance(default, bool) and isinstance(value, bool)
+    if not isinstance(value, (int, float)):
+        return False
+    if limit is not None:
+        low, high = limit
+        return low <= value <= high
+    return True
+
+
+async def write_initial_values(server, nodes_values):
+    """
+    Writes all (node, Variant) pairs in a single Write service call instead
+    of awaiting one write per node.
+    """
+    params = ua.WriteParameters()
+    for node, variant in nodes_values:
+        write_value = ua.WriteValue()
+        write_value.NodeId = node.nodeid
+        write_value.AttributeId = ua.AttributeIds.Value
+        write_value.Value = ua.DataValue(variant)
+        params.NodesToWrite.append(write_value)
+    results = await server.iserver.isession.write(params)
+    for (node, variant), status in zip(nodes_values, results):
+        if not status.is_good():
+            logging.warning(f"Initial write of {node.nodeid.Identifier}={variant.Value} failed: {status}")
+    return results
@@ -36,6 +36,14 @@ class Ruleset(SimpleRoleRuleset):
         ua.ObjectIds.CallRequest_Encoding_DefaultBinary,
         ua.ObjectIds.RegisterNodesRequest_Encoding_DefaultBinary,
         ua.ObjectIds.UnregisterNodesRequest_Encoding_DefaultBinary,
+        # Read-only subscriptions, so anonymous clients can receive events
+        ua.ObjectIds.CreateSubscriptionRequest_Encoding_DefaultBinary,
+        ua.ObjectIds.ModifySubscriptionRequest_Encoding_DefaultBinary,
+        ua.ObjectIds.DeleteSubscriptionsRequest_Encoding_DefaultBinary,
+        ua.ObjectIds.CreateMonitoredItemsRequest_Encoding_DefaultBinary,
+        ua.ObjectIds.DeleteMonitoredItemsRequest_Encoding_DefaultBinary,
+        ua.ObjectIds.PublishRequest_Encoding_DefaultBinary,
+        ua.ObjectIds.RepublishRequest_Encoding_DefaultBinary,
     ]
 
     
@@ -0,0 +1,91 @@
+import copy
+import logging
+import time
+from asyncua import ua
+
+
+class WriteValidator:
+    """
+    Range validation for client writes, keyed by resolved NodeId.
+
+    The limit table is built once at startup from the EURange property of
+    every writable node, so a WriteRequest is checked with one dictionary
+    lookup per item instead of string matching on the NodeId. Invalid items
+    get their own status code (BadOutOfRange) while the valid items of the
+    same request are still written - the partial success OPC UA clients expect.
+    """
+    def __init__(self, limits=None):
+        self.limits = limits or {}  # NodeId -> (low, high)
+        self.diag = None
+        self.on_reject = None  # Optional async callable(write_value, status)
+
+    @classmethod
+    async def from_nodes(cls, nodes, ns):
+        limits = {}
+        for node in nodes:
+            try:
+                eu_range = await (await node.get_child(f"{ns}:EURange")).read_value()
+            except ua.UaStatusCodeError:
+                continue  # No EURange -> nothing to validate
+            limits[node.nodeid] = (eu_range.Low, eu_range.High)
+        return cls(limits)
+
+    def check(self, write_value):
+        """Returns a bad StatusCode for an invalid item or None if it may be written."""
+        if write_value.AttributeId != ua.AttributeIds.Value:
+            return None
+        limit = self.limits.get(write_value.NodeId)
+        if limit is None:
+            return None
+        new_val = write_value.Value.Value.Value  # Extract the actual python value
+        if isinstance(new_val, bool) or not isinstance(new_val, (int, float)):
+            return None  # Let the address space answer with BadTypeMismatch
+        low, high = limit
+        if not (low <= new_val <= high):
+            logging.warning(f"Rejected write to {write_value.NodeId.Identifier}: {new_val} not in [{low}, {high}]")
+            return ua.StatusCode(ua.StatusCodes.BadOutOfRange)
+        return None
+
+    def validate(self, nodes_to_write):
+        """Checks a whole batch in one pass, returns one entry per item."""
+        return [self.check(write_value) for write_value in nodes_to_write]
+
+    def install(self, server, diag=None):
+        """
+        Hooks the validator in front of the server's attribute service, the
+        single place where every Write service call ends up.
+        """
+        self.diag = diag
+        attribute_service = server.iserver.attribute_service
+        original_write = attribute_service.write
+
+        async def write(params, *args, **kwargs):
+            start = time.perf_counter()
+            verdicts = self.validate(params.NodesToWrite)
+            # The server's own writes (internal session) pass through here as
+            # well, only client WriteRequests are accounted
+            user = args[0] if args else kwargs.get("user")
+            if self.diag and user is not server.iserver.isession.user:
+                self.diag.count_request()
+                # Validation time only for batches that actually had limits to check
+                if any(wv.NodeId in self.limits for wv in params.NodesToWrite):
+                    self.diag.record_callback("validate_thresholds", time.perf_counter() - start)
+            if all(verdict is None for verdict in verdicts):
+                return await original_write(params, *args, **kwargs)
+
+            if self.on_reject:
+                for write_value, verdict in zip(params.NodesToWrite, verdicts):
+                    if verdict is not None:
+                        await self.on_reject(write_value, verdict)
+
+            # Forward only the valid items and merge the results back in order
+            accepted = [wv for wv, verdict in zip(params.NodesToWrite, verdicts) if verdict is None]
+            results = []
+            if accepted:
+                valid_params = copy.copy(params)
+                valid_params.NodesToWrite = accepted
+                results = list(await original_write(valid_params, *args, **kwargs))
+            written = iter(results)
+            return [verdict if verdict is not None else next(written) for verdict in verdicts]
+
+        attribute_service.write = write